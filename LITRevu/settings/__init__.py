@@ -0,0 +1,29 @@
+"""
+Settings of LITRevu project, split by environment.
+
+The profile is chosen by the DJANGO_ENV environment variable:
+
+- 'dev' (default): debug on, for `runserver` and the tests;
+- 'prod': debug off, persistent connections, cached sessions and
+  templates, compressed static files served by WhiteNoise;
+- 'bench': the production profile on a throwaway database, for the load
+  tests and the benchmarks.
+
+A profile can also be selected directly with
+DJANGO_SETTINGS_MODULE=LITRevu.settings.<profile>.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+PROFILE = os.environ.get('DJANGO_ENV', 'dev')
+
+if PROFILE == 'dev':
+    from .dev import *  # noqa: F401,F403
+elif PROFILE == 'prod':
+    from .prod import *  # noqa: F401,F403
+elif PROFILE == 'bench':
+    from .bench import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(
+        f"Unknown DJANGO_ENV {PROFILE!r}, expected dev, prod or bench.")
@@ -0,0 +1,242 @@
+"""
+Django settings for LITRevu project, shared by every profile.
+
+Generated by 'django-admin startproject' using Django 5.1.6.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.1/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/5.1/ref/settings/
+"""
+
+import os
+from pathlib import Path
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY')
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = False
+
+ALLOWED_HOSTS = [host for host in
+                 os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'reviews',
+    'authentification'
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'reviews.middleware.ReplicaMiddleware',
+]
+
+ROOT_URLCONF = 'LITRevu.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [BASE_DIR.joinpath('templates'),],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'LITRevu.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+# SQLite by default, PostgreSQL with DJANGO_DB_ENGINE=postgresql and the
+# POSTGRES_* variables (the psycopg package must be installed).
+
+if os.environ.get('DJANGO_DB_ENGINE', 'sqlite') == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'litrevu'),
+            'USER': os.environ.get('POSTGRES_USER', 'litrevu'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        }
+    }
+    REPLICA = {'HOST': os.environ.get('POSTGRES_REPLICA_HOST')}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DJANGO_DB_NAME',
+                                   BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # transactions take the write lock when they start, so that
+                # a reader never has to upgrade its lock and fail immediately
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+    REPLICA = {'NAME': os.environ.get('DJANGO_DB_REPLICA_NAME')}
+
+# The feed views read the 'replica' database when one is given
+# (POSTGRES_REPLICA_HOST, or the SQLite copy in DJANGO_DB_REPLICA_NAME), the
+# primary one otherwise. A client that has just posted reads the primary for
+# REPLICA_STICKINESS seconds. See `reviews/routers.py`.
+if any(REPLICA.values()):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        **{key: value for key, value in REPLICA.items() if value},
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['reviews.routers.ReplicaRouter']
+REPLICA_DATABASE = 'replica'
+REPLICA_VIEWS = ['flux', 'flux_items', 'user_posts', 'follow']
+REPLICA_STICKINESS = 10
+# the tests mirror the primary database as the replica when none is given
+TEST_RUNNER = 'LITRevu.test_runner.ReplicaTestRunner'
+
+# Pragmas applied to every SQLite connection, for several workers sharing the
+# database: the write-ahead log lets readers run while a ticket is written,
+# synchronous=NORMAL is safe with it, the database is memory-mapped (bytes)
+# with a page cache of 20 MB (negative size in KB), and a locked database is
+# waited for up to busy_timeout milliseconds.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,
+    'busy_timeout': 5000,
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# The per-process memory cache can be replaced by a cache shared by the
+# workers, e.g. 'django.core.cache.backends.filebased.FileBasedCache' with
+# 'LOCATION': BASE_DIR / 'tmp/cache', or
+# 'django.core.cache.backends.db.DatabaseCache' with 'LOCATION': 'cache_table'
+# after `python manage.py createcachetable`.
+# The cards of the tickets and reviews are cached by the `{% cache %}` tag in
+# a 'template_fragments' cache when one is defined, in 'default' otherwise.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# cache alias and lifetime (in seconds) of the users' relationship snapshots
+RELATIONS_CACHE = 'default'
+RELATIONS_CACHE_TIMEOUT = 3600
+
+
+# Password validation
+# https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',  # noqa: E501
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',  # noqa: E501
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',  # noqa: E501
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',  # noqa: E501
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/5.1/topics/i18n/
+
+LANGUAGE_CODE = 'en-us'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/5.1/howto/static-files/
+
+STATIC_URL = '/static/'
+STATICFILES_DIRS = [BASE_DIR / "static"]
+
+EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+EMAIL_FILE_PATH = BASE_DIR / "tmp/app-messages"
+
+STATIC_ROOT = BASE_DIR / "staticfiles"
+# Default primary key field type
+# https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+AUTH_USER_MODEL = 'authentification.User'
+
+
+LOGIN_URL = 'login'
+LOGIN_REDIRECT_URL = '/'
+LOGOUT_REDIRECT_URL = 'login'
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR.joinpath('media')
+
+# Threads converting the uploaded pictures after the request. With 0, they are
+# converted in the request, once the ticket is saved.
+IMAGE_PROCESSING_WORKERS = 2
+
+# Widths of the WebP versions of the uploaded pictures (1x, 2x and 3x of the
+# 180px wide covers), their quality, and the width of the blurred placeholder
+# shown while they load. Run `python manage.py reprocess_covers` after changing
+# them.
+IMAGE_DERIVATIVE_WIDTHS = [180, 360, 540]
+IMAGE_DERIVATIVE_QUALITY = 80
+IMAGE_PLACEHOLDER_WIDTH = 16
+
+# Read the feed from timelines precomputed when posts are created (fan-out on
+# write). Run `python manage.py rebuild_timelines` after enabling it.
+MATERIALIZED_TIMELINE = False
+
+# Serve the feed, the user posts and the follow page with the async views of
+# `reviews/async_views.py`, when the application runs under LITRevu.asgi.
+ASYNC_FEED_VIEWS = os.environ.get('DJANGO_ASYNC_FEED_VIEWS', '0') == '1'
+
+# The "new posts" event streams of the feed wake up when a post is saved by
+# the same process, and count the new items at least every
+# NOTIFICATIONS_POLL_INTERVAL seconds for the posts saved by other workers.
+# A stream is closed after NOTIFICATIONS_STREAM_DURATION seconds, and the
+# browser reconnects NOTIFICATIONS_RETRY seconds later.
+NOTIFICATIONS_POLL_INTERVAL = 15
+NOTIFICATIONS_STREAM_DURATION = 300
+NOTIFICATIONS_RETRY = 5
@@ -0,0 +1,48 @@
+"""
+Benchmark settings for LITRevu project.
+
+The production profile, on its own database and without the external
+setup it needs: a secret key is provided, the static files are served from
+the app directories without `collectstatic`, and the passwords are hashed
+with a fast hasher, so that the load tests can log in thousands of seeded
+users.
+
+    DJANGO_ENV=bench
+"""
+import os
+
+# the production profile refuses to start without a secret key
+os.environ.setdefault('DJANGO_SECRET_KEY', 'django-insecure-benchmark')
+
+from .prod import *  # noqa: E402,F401,F403
+from .prod import BASE_DIR, CACHES, DATABASES, STORAGES  # noqa: E402
+
+ALLOWED_HOSTS = ['localhost', '127.0.0.1', 'testserver']
+
+# both aliases, the replica being the same SQLite database
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES = {
+        alias: {**database,
+                'NAME': os.environ.get('DJANGO_DB_NAME',
+                                       BASE_DIR / 'bench.sqlite3')}
+        for alias, database in DATABASES.items()
+    }
+    # a shared cache of its own, the entries of another benchmark database
+    # would describe other users
+    CACHES = {
+        **CACHES,
+        'shared': {**CACHES['shared'],
+                   'LOCATION': f"{DATABASES['default']['NAME']}.cache"},
+    }
+
+STORAGES = {
+    **STORAGES,
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+WHITENOISE_USE_FINDERS = True
+STATIC_ROOT = None
+
+# SECURITY WARNING: only for seeded users, never for real passwords
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
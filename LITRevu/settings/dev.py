@@ -0,0 +1,19 @@
+"""
+Development settings for LITRevu project.
+
+Quick-start development settings - unsuitable for production
+See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
+"""
+import os
+
+from .base import *  # noqa: F401,F403
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY',
+    'django-insecure-x8ptcdn%6ak=5-2(^t%0qj1i-n!6gs+hrd$o7+(qw#$yj&7^qa')
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = True
+
+ALLOWED_HOSTS = []
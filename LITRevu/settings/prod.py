@@ -0,0 +1,101 @@
+"""
+Production settings for LITRevu project.
+
+Debug is off, the secret key and the allowed hosts come from the
+environment. Database connections are kept open between requests, sessions
+and relationships are read from a cache shared by the workers, the
+templates are compiled once per process by cached loaders, warmed when the
+WSGI or ASGI application starts, and the static files are served
+compressed by WhiteNoise after `python manage.py collectstatic`.
+
+    DJANGO_ENV=prod
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import BASE_DIR, DATABASES, MIDDLEWARE
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY')
+if not SECRET_KEY:
+    raise ImproperlyConfigured("DJANGO_SECRET_KEY must be set.")
+
+DEBUG = False
+
+# WhiteNoise serves the static files, right after the security middleware
+MIDDLEWARE = [
+    MIDDLEWARE[0],
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    *MIDDLEWARE[1:],
+]
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [BASE_DIR.joinpath('templates'), ],
+        # the loaders are given explicitly, the app directories are read by
+        # the second one
+        'APP_DIRS': False,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    },
+]
+
+# Compile the project's templates when the application starts, instead of
+# during the first requests. Disabled with DJANGO_TEMPLATES_WARMUP=0.
+TEMPLATES_WARMUP = os.environ.get('DJANGO_TEMPLATES_WARMUP', '1') == '1'
+
+# connections are kept open for CONN_MAX_AGE seconds and checked before
+# being reused
+DATABASES = {
+    alias: {**database,
+            'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True}
+    for alias, database in DATABASES.items()
+}
+
+# The relationship snapshots and the sessions are invalidated by the worker
+# handling a ban, an unfollow or a logout, so they are kept in a cache shared
+# by all the workers of the host instead of the memory of each one. The
+# template fragments, keyed by their version, stay in memory.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DJANGO_CACHE_DIR',
+                                   BASE_DIR / 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+RELATIONS_CACHE = 'shared'
+
+# sessions are read from the cache, the database is only read on a miss
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'shared'
+
+# compressed (gzip, brotli when installed) and fingerprinted static files,
+# cached forever by the browsers
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND':
+            'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class ReplicaTestRunner(DiscoverRunner):
+    """
+    Runs the tests with a replica database even when none is configured.
+
+    Without DJANGO_DB_REPLICA_NAME nor POSTGRES_REPLICA_HOST, the
+    `REPLICA_DATABASE` alias is added for the tests only, as a mirror of
+    the primary test database, so that the routing of the feed views is
+    exercised by `ReplicaTestCase`.
+    """
+
+    def setup_databases(self, **kwargs):
+        alias = settings.REPLICA_DATABASE
+        if alias not in settings.DATABASES:
+            default = settings.DATABASES['default']
+            settings.DATABASES[alias] = {
+                **default,
+                'TEST': {**default.get('TEST', {}), 'MIRROR': 'default'},
+            }
+        return super().setup_databases(**kwargs)
@@ -24,7 +24,10 @@ from django.conf.urls.static import static
 from authentification.views import CustomLoginView, CustomSignUpView, \
     UserUpdateView
 
-from reviews import views as r_views
+from reviews import async_views, views as r_views
+
+# the read-only feed views, async when served by LITRevu.asgi
+feed_views = async_views if settings.ASYNC_FEED_VIEWS else r_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -61,9 +64,13 @@ urlpatterns = [
         template_name="authentification/password_reset_complete.html"),
          name="password_reset_complete"),
 
-    path('', r_views.flux, name='flux'),
+    path('', feed_views.flux, name='flux'),
+    path('items/', r_views.flux_items, name='flux_items'),
+    path('new-posts/', r_views.new_posts, name='new_posts'),
 
-    path('follow/', r_views.follow, name='follow'),
+    path('follow/', feed_views.follow, name='follow'),
+    path('follow/search/', r_views.search_users, name='search_users'),
+    path('follow/bulk/', r_views.bulk_follows, name='bulk_follows'),
     path('follow/<int:user_id>/unfollow',
          r_views.unfollow,
          name='unfollow'),
@@ -78,7 +85,7 @@ urlpatterns = [
          name='unban_followers'),
 
     path('account/', UserUpdateView.as_view(), name='account'),
-    path('posts/', r_views.user_posts, name='user_posts'),
+    path('posts/', feed_views.user_posts, name='user_posts'),
 
     path('reviews/create-review/',
          r_views.create_review,
@@ -107,6 +114,10 @@ urlpatterns = [
     path('tickets/<int:ticket_id>/answer-ticket/',
          r_views.answer_ticket,
          name='answer_ticket'),
+
+    path('tickets/<int:ticket_id>/cover/<slug:digest>.webp',
+         r_views.ticket_cover,
+         name='ticket_cover'),
 ]
 
 if settings.DEBUG:
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
 
 
 class User(AbstractUser):
@@ -10,6 +11,15 @@ class User(AbstractUser):
 
        Attributes:
            email: An emailfield for storing the user's email.
+
+       Meta:
+           indexes (list): The lowercased usernames, for the prefix search
+                           of the users to follow.
     """
 
     email = models.EmailField(unique=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+        ]
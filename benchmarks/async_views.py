@@ -0,0 +1,183 @@
+"""
+Compares the latency of the feed views served synchronously through the
+WSGI handler and asynchronously through the ASGI handler, at the same
+concurrency.
+
+A throwaway database is seeded once. Then, in a fresh process for each
+mode, --concurrency clients request the feed, its second page, the user
+posts and the follow page in a loop for --seconds:
+
+- sync: the sync views, each client in its own thread, as with a threaded
+  WSGI server;
+- async: the async views (`ASYNC_FEED_VIEWS`), every client being a task of
+  one event loop, as with an ASGI server.
+
+    python benchmarks/async_views.py --concurrency 8 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    'sync': {'DJANGO_ASYNC_FEED_VIEWS': '0'},
+    'async': {'DJANGO_ASYNC_FEED_VIEWS': '1'},
+}
+
+URLS = ('flux', 'flux page 2', 'user_posts', 'follow')
+
+
+def members(count: int) -> list:
+    from django.db.models import Count
+
+    from authentification.models import User
+
+    return list(User.objects.annotate(followings=Count('following'))
+                .order_by('-followings')[:count])
+
+
+def urls() -> dict:
+    from django.urls import reverse
+
+    from reviews.feed import flux_timeline
+    from reviews.views import PAGE_SIZE
+
+    member = members(1)[0]
+    cursor = flux_timeline(member).page(None, PAGE_SIZE).next_cursor
+    return {'flux': reverse('flux'),
+            'flux page 2': f"{reverse('flux')}?cursor={cursor}",
+            'user_posts': reverse('user_posts'),
+            'follow': reverse('follow')}
+
+
+def run_sync(args) -> dict:
+    from django.test import Client
+
+    paths = urls()
+    clients = []
+    for member in members(args.concurrency):
+        client = Client()
+        client.force_login(member)
+        clients.append(client)
+
+    def loop(client):
+        timings = {name: [] for name in URLS}
+        end = time.perf_counter() + args.seconds
+        while time.perf_counter() < end:
+            for name, path in paths.items():
+                start = time.perf_counter()
+                response = client.get(path)
+                timings[name].append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200, response.status_code
+        return timings
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        return merge(executor.map(loop, clients))
+
+
+async def run_async(args) -> dict:
+    from asgiref.sync import sync_to_async
+    from django.test import AsyncClient
+
+    paths = await sync_to_async(urls)()
+    clients = []
+    for member in await sync_to_async(members)(args.concurrency):
+        client = AsyncClient()
+        await client.aforce_login(member)
+        clients.append(client)
+
+    async def loop(client):
+        timings = {name: [] for name in URLS}
+        end = time.perf_counter() + args.seconds
+        while time.perf_counter() < end:
+            for name, path in paths.items():
+                start = time.perf_counter()
+                response = await client.get(path)
+                timings[name].append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200, response.status_code
+        return timings
+
+    return merge(await asyncio.gather(*(loop(client) for client in clients)))
+
+
+def merge(results) -> dict:
+    timings = {name: [] for name in URLS}
+    for result in results:
+        for name, values in result.items():
+            timings[name].extend(values)
+    return timings
+
+
+def child(mode: str, args) -> dict:
+    """
+    Runs in the measured process and returns the latencies in ms.
+    """
+    sys.path.insert(0, ROOT)
+    import django
+
+    django.setup()
+    if mode == 'async':
+        return asyncio.run(run_async(args))
+    return run_sync(args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child, args)))
+        return
+
+    database = os.path.join(tempfile.mkdtemp(), 'async.sqlite3')
+    environment = {**os.environ,
+                   'DJANGO_SETTINGS_MODULE': 'LITRevu.settings',
+                   'DJANGO_ENV': 'bench',
+                   'DJANGO_DB_NAME': database}
+
+    os.environ.update(environment)
+    sys.path.insert(0, ROOT)
+    import django
+
+    django.setup()
+    from django.core.management import call_command
+
+    from reviews.seeding import seed_social_graph
+
+    call_command('migrate', verbosity=0)
+    seed_social_graph(users=args.users)
+
+    print(f"{args.concurrency} concurrent clients, {args.seconds:g}s "
+          f"per mode (latencies in ms)")
+    print(f"{'':<8}{'url':<14}{'requests':>10}{'p50':>10}{'p95':>10}"
+          f"{'max':>10}")
+    for mode, variables in MODES.items():
+        timings = json.loads(subprocess.run(
+            [sys.executable, __file__, '--child', mode,
+             '--concurrency', str(args.concurrency),
+             '--seconds', str(args.seconds)],
+            env={**environment, **variables}, check=True,
+            capture_output=True, text=True,
+        ).stdout)
+        for name in URLS:
+            values = sorted(timings[name])
+            print(f"{mode:<8}{name:<14}{len(values):>10}"
+                  f"{statistics.median(values):>10.1f}"
+                  f"{values[int(len(values) * .95)]:>10.1f}"
+                  f"{values[-1]:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
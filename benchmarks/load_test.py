@@ -0,0 +1,271 @@
+"""
+Runs virtual users through the main journey of LITRevu and reports the
+latency percentiles of every URL name of `LITRevu/urls.py`.
+
+Each of the --clients virtual users repeats, for --seconds: log in with a
+random seeded member, read the feed, load --pages more pages of items,
+then open the review form and post a review. A random pause of up to
+--wait seconds follows every request.
+
+Without --url, the requests are served in-process by the Django test client
+on a throwaway `bench` database seeded by `seed_litrevu`. With --url, they
+are sent to a running server, whose database was seeded with
+`manage.py seed_litrevu` and is read by the script for the usernames, with
+the same settings and environment as the server.
+
+    python benchmarks/load_test.py --clients 8 --seconds 30
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --clients 4
+"""
+import argparse
+import html
+import http.cookiejar
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the cursor of the second page, held by the "load more" button of the feed
+CURSOR = re.compile(r'id="load-more" data-cursor="([^"]*)"')
+
+
+class InProcessSession:
+    """
+    A logged out browser whose requests are served by the Django test client.
+    """
+
+    def __init__(self, base_url=None):
+        from django.test import Client
+
+        self.client = Client(raise_request_exception=False)
+
+    def get(self, path: str) -> tuple:
+        return self.send(self.client.get(path))
+
+    def post(self, path: str, data: dict) -> tuple:
+        return self.send(self.client.post(path, data))
+
+    @staticmethod
+    def send(response) -> tuple:
+        return (response.status_code, response.headers,
+                response.content.decode())
+
+
+class HttpSession:
+    """
+    A logged out browser sending its requests to a running server, keeping
+    its cookies and sending back the CSRF token with its forms. Redirections
+    are not followed, to time each request on its own.
+    """
+
+    class NoRedirection(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies),
+            self.NoRedirection)
+
+    def get(self, path: str) -> tuple:
+        return self.send(urllib.request.Request(self.base_url + path))
+
+    def post(self, path: str, data: dict) -> tuple:
+        token = next((cookie.value for cookie in self.cookies
+                      if cookie.name == 'csrftoken'), '')
+        body = urllib.parse.urlencode({**data, 'csrfmiddlewaretoken': token})
+        return self.send(urllib.request.Request(
+            self.base_url + path, data=body.encode(),
+            headers={'Referer': self.base_url + path}))
+
+    def send(self, request) -> tuple:
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                return (response.status, response.headers,
+                        response.read().decode())
+        except urllib.error.HTTPError as error:
+            return error.code, error.headers, error.read().decode()
+
+
+class Recorder:
+    """
+    Collects the latencies in ms and the failures per URL name, from all
+    the virtual users.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def add(self, name: str, latency: float, failed: bool) -> None:
+        with self.lock:
+            self.latencies.setdefault(name, []).append(latency)
+            self.errors[name] = self.errors.get(name, 0) + failed
+
+
+def url_name(path: str) -> str:
+    from django.urls import resolve
+
+    return resolve(urllib.parse.urlsplit(path).path).url_name
+
+
+class VirtualUser:
+    """
+    Goes through login, feed, pagination and review creation in a loop.
+    """
+
+    def __init__(self, session_class, args, usernames, recorder, seed):
+        self.session_class = session_class
+        self.args = args
+        self.usernames = usernames
+        self.recorder = recorder
+        self.rng = random.Random(seed)
+
+    def request(self, session, method, path, data=None, expected=200):
+        start = time.perf_counter()
+        try:
+            if method == 'post':
+                status, headers, body = session.post(path, data)
+            else:
+                status, headers, body = session.get(path)
+        except OSError:
+            status, headers, body = None, {}, ''
+        self.recorder.add(url_name(path),
+                          (time.perf_counter() - start) * 1000,
+                          status != expected)
+        if self.args.wait:
+            time.sleep(self.rng.uniform(0, self.args.wait))
+        return status, headers, body
+
+    def journey(self) -> None:
+        from django.urls import reverse
+
+        session = self.session_class(self.args.url)
+        login = reverse('login')
+        self.request(session, 'get', login)
+        status, _, _ = self.request(
+            session, 'post', login,
+            {'username': self.rng.choice(self.usernames),
+             'password': self.args.password},
+            expected=302)
+        if status != 302:
+            return
+
+        _, _, body = self.request(session, 'get', reverse('flux'))
+        match = CURSOR.search(body)
+        cursor = html.unescape(match.group(1)) if match else ''
+        for _ in range(self.args.pages):
+            if not cursor:
+                break
+            _, headers, _ = self.request(
+                session, 'get', f"{reverse('flux_items')}?"
+                + urllib.parse.urlencode({'cursor': cursor}))
+            cursor = headers.get('X-Next-Cursor', '')
+
+        create_review = reverse('create_review')
+        self.request(session, 'get', create_review)
+        self.request(session, 'post', create_review,
+                     {'title': 'Livre du test de charge',
+                      'description': 'Description du livre.',
+                      'headline': 'Critique du test de charge',
+                      'rating': self.rng.randint(1, 5),
+                      'body': 'Mon avis sur ce livre.'},
+                     expected=302)
+
+    def run(self, end: float) -> int:
+        from django.db import connections
+
+        journeys = 0
+        try:
+            while time.perf_counter() < end:
+                self.journey()
+                journeys += 1
+        finally:
+            connections.close_all()
+        return journeys
+
+
+def percentile(values: list, fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(recorder: Recorder, journeys: int, seconds: float) -> None:
+    total = sum(map(len, recorder.latencies.values()))
+    print(f"{journeys} journeys, {total} requests in {seconds:.1f}s "
+          f"({total / seconds:.1f} requests/s, latencies in ms)")
+    print(f"{'url name':<16}{'requests':>10}{'errors':>8}{'p50':>10}"
+          f"{'p95':>10}{'p99':>10}{'max':>10}")
+    for name, values in recorder.latencies.items():
+        values = sorted(values)
+        print(f"{name:<16}{len(values):>10}{recorder.errors[name]:>8}"
+              f"{percentile(values, .5):>10.1f}"
+              f"{percentile(values, .95):>10.1f}"
+              f"{percentile(values, .99):>10.1f}{values[-1]:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url',
+                        help="The address of a running server, otherwise "
+                             "the requests are served in-process.")
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--pages', type=int, default=2,
+                        help="The number of pages loaded after the feed.")
+    parser.add_argument('--wait', type=float, default=0,
+                        help="The longest pause after each request.")
+    parser.add_argument('--users', type=int, default=1000,
+                        help="The number of members seeded in-process.")
+    parser.add_argument('--prefix', default='member')
+    parser.add_argument('--password', default='Invit1234')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LITRevu.settings')
+    if not args.url:
+        os.environ['DJANGO_ENV'] = 'bench'
+        os.environ['DJANGO_DB_NAME'] = os.path.join(tempfile.mkdtemp(),
+                                                    'load.sqlite3')
+    sys.path.insert(0, ROOT)
+    import django
+
+    django.setup()
+    from django.core.management import call_command
+
+    from authentification.models import User
+
+    if not args.url:
+        call_command('migrate', verbosity=0)
+        call_command('seed_litrevu', users=args.users, prefix=args.prefix,
+                     password=args.password)
+
+    usernames = list(User.objects.filter(username__startswith=args.prefix)
+                     .values_list('username', flat=True)[:10000])
+    if not usernames:
+        sys.exit(f"No seeded {args.prefix!r} members, "
+                 f"run manage.py seed_litrevu first.")
+
+    session_class = HttpSession if args.url else InProcessSession
+    recorder = Recorder()
+    users = [VirtualUser(session_class, args, usernames, recorder, seed)
+             for seed in range(args.clients)]
+
+    start = time.perf_counter()
+    end = start + args.seconds
+    with ThreadPoolExecutor(max_workers=args.clients) as executor:
+        journeys = sum(executor.map(lambda user: user.run(end), users))
+    report(recorder, journeys, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
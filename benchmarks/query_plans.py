@@ -0,0 +1,111 @@
+"""
+Compares the query plans and timings of the feed and relationship queries
+without and with the indexes of the `0005_feed_indexes` migration.
+
+A throwaway SQLite database is migrated, seeded with a random social graph,
+then every query is explained and timed before and after the indexes are
+created. The development database is not touched.
+
+    python benchmarks/query_plans.py --users 2000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import django
+
+# Définir les settings Django manuellement
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "LITRevu.settings")
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Count  # noqa: E402
+
+from authentification.models import User  # noqa: E402
+from reviews.feed import Timeline, flux_querysets  # noqa: E402
+from reviews.models import Review, Ticket  # noqa: E402
+from reviews.relations import (get_banned_users,  # noqa: E402
+                               get_banning_users, relations_cache)
+from reviews.seeding import seed_social_graph  # noqa: E402
+
+BEFORE = '0004_ticket_picture_derivatives'
+AFTER = '0005_feed_indexes'
+
+
+def queries(user: User) -> dict:
+    """
+    Builds the queries run by the views for a user, by name.
+    """
+    reviews, tickets = flux_querysets(user)
+    page_tickets = list(Ticket.objects.filter(user=user)
+                        .values_list('id', flat=True)[:6])
+    return {
+        'flux page': Timeline(reviews, tickets).entries()[:7],
+        'user_posts page': Timeline(
+            Review.objects.filter(user=user),
+            Ticket.objects.filter(user=user)).entries()[:7],
+        'banning users': get_banning_users(user),
+        'banned users': get_banned_users(user),
+        'tickets answered by user': Review.objects.filter(
+            ticket__in=page_tickets, user=user).values_list('ticket'),
+    }
+
+
+def measure(user: User, repeat: int) -> dict:
+    """
+    Returns the plan and the median duration in ms of every query.
+    """
+    results = {}
+    for name, queryset in queries(user).items():
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(queryset.all())
+            durations.append((time.perf_counter() - start) * 1000)
+        results[name] = (queryset.explain(), statistics.median(durations))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    # base de données de test, en mémoire pour SQLite
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        relations_cache().clear()
+        seed_social_graph(users=args.users, tickets_per_user=5,
+                          reviews_per_user=5)
+        # the most followed user, whose feed is the largest
+        user = (User.objects.annotate(count=Count('followers'))
+                .order_by('-count').first())
+
+        call_command('migrate', 'reviews', BEFORE, verbosity=0)
+        connection.cursor().execute('ANALYZE')
+        before = measure(user, args.repeat)
+
+        call_command('migrate', 'reviews', AFTER, verbosity=0)
+        connection.cursor().execute('ANALYZE')
+        after = measure(user, args.repeat)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    for name in before:
+        (plan_before, ms_before), (plan_after, ms_after) = (before[name],
+                                                            after[name])
+        print(f'=== {name}: {ms_before:.2f} ms -> {ms_after:.2f} ms')
+        print('--- before')
+        print(plan_before)
+        print('--- after')
+        print(plan_after)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Reads the feed while tickets are being created, from several processes
+sharing one SQLite database file, with the default and the tuned SQLite
+configuration.
+
+Each reader process logs a member in and requests the feed in a loop, each
+writer process creates tickets in a loop. The read latencies, the number of
+tickets written and the "database is locked" errors are reported. The
+script fails when the tuned configuration raises errors or when its read
+p95 goes over --max-p95 milliseconds.
+
+    python benchmarks/sqlite_stress.py --readers 4 --writers 2 --seconds 10
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# journal, locking and waiting as Django and SQLite do by default
+DEFAULT = {'pragmas': {'journal_mode': 'DELETE'},
+           'transaction_mode': None}
+
+
+def setup(mode: str) -> None:
+    """
+    Initializes Django in a worker process, with the configuration to
+    measure.
+    """
+    sys.path.insert(0, ROOT)
+    import django
+
+    django.setup()
+    if mode == 'default':
+        from django.conf import settings
+        from django.db import connection
+
+        settings.SQLITE_PRAGMAS = DEFAULT['pragmas']
+        connection.settings_dict['OPTIONS'].pop('transaction_mode', None)
+
+
+def read(seconds: float, member_id: int) -> dict:
+    from django.db import OperationalError
+    from django.test import Client
+    from django.urls import reverse
+
+    from authentification.models import User
+
+    client = Client()
+    client.force_login(User.objects.get(id=member_id))
+
+    latencies, errors = [], 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        try:
+            client.get(reverse('flux'))
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {'latencies': latencies, 'errors': errors}
+
+
+def write(seconds: float, member_id: int) -> dict:
+    from django.db import OperationalError
+
+    from reviews.models import Ticket
+
+    written, errors = 0, 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        try:
+            Ticket.objects.create(title='Nouveau livre',
+                                  description='Description du livre.',
+                                  user_id=member_id)
+            written += 1
+        except OperationalError:
+            errors += 1
+    return {'written': written, 'errors': errors}
+
+
+def run(mode: str, args, member_id: int) -> dict:
+    """
+    Runs the readers and the writers in parallel and merges their results.
+    """
+    executor = ProcessPoolExecutor(
+        max_workers=args.readers + args.writers,
+        mp_context=get_context('spawn'),
+        initializer=setup, initargs=(mode,))
+    with executor:
+        readers = [executor.submit(read, args.seconds, member_id)
+                   for _ in range(args.readers)]
+        writers = [executor.submit(write, args.seconds, member_id)
+                   for _ in range(args.writers)]
+        readers = [future.result() for future in readers]
+        writers = [future.result() for future in writers]
+
+    latencies = sorted(latency for result in readers
+                       for latency in result['latencies'])
+    return {
+        'reads': len(latencies),
+        'p50': statistics.median(latencies) if latencies else 0,
+        'p95': latencies[int(len(latencies) * .95)] if latencies else 0,
+        'max': latencies[-1] if latencies else 0,
+        'writes': sum(result['written'] for result in writers),
+        'errors': sum(result['errors'] for result in readers + writers),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--max-p95', type=float, default=200)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'LITRevu.settings'
+    os.environ['DJANGO_ENV'] = 'bench'
+    os.environ['DJANGO_DB_NAME'] = os.path.join(directory, 'stress.sqlite3')
+
+    setup('tuned')
+    from django.core.management import call_command
+    from django.db import connection
+    from django.db.models import Count
+
+    from authentification.models import User
+    from reviews.seeding import seed_social_graph
+
+    call_command('migrate', verbosity=0)
+    seed_social_graph(users=args.users)
+    member_id = (User.objects.annotate(count=Count('following'))
+                 .order_by('-count').values_list('id', flat=True).first())
+
+    results = {}
+    for mode in ('default', 'tuned'):
+        # the journal mode is stored in the database file
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode = '
+                           + ('DELETE' if mode == 'default' else 'WAL'))
+        connection.close()
+        results[mode] = run(mode, args, member_id)
+
+    print(f"{args.readers} readers, {args.writers} writers, "
+          f"{args.seconds:g}s")
+    print(f"{'':<10}{'reads':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"
+          f"{'writes':>8}{'errors':>8}")
+    for mode, result in results.items():
+        print(f"{mode:<10}{result['reads']:>8}{result['p50']:>10.1f}"
+              f"{result['p95']:>10.1f}{result['max']:>10.1f}"
+              f"{result['writes']:>8}{result['errors']:>8}")
+
+    tuned = results['tuned']
+    if tuned['errors'] or tuned['p95'] > args.max_p95:
+        sys.exit("The tuned configuration is locked or too slow.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Measures the startup of the application and the latency of its first
+requests, with cold and warm template caches.
+
+Every profile is run in fresh processes: the WSGI application is imported,
+a throwaway database is seeded, then the feed is requested twice by the
+same member. The first request of a cold process pays the compilation of
+the templates, which the warm-up moves to the startup.
+
+    python benchmarks/startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILES = {
+    'dev': {'DJANGO_ENV': 'dev'},
+    'bench, cold': {'DJANGO_ENV': 'bench', 'DJANGO_TEMPLATES_WARMUP': '0'},
+    'bench, warm': {'DJANGO_ENV': 'bench', 'DJANGO_TEMPLATES_WARMUP': '1'},
+}
+
+
+def child(users: int) -> dict:
+    """
+    Runs in the measured process and returns its timings in ms.
+    """
+    sys.path.insert(0, ROOT)
+
+    start = time.perf_counter()
+    import LITRevu.wsgi  # noqa: F401
+    startup = time.perf_counter() - start
+
+    from django.db import connection
+    from django.db.models import Count
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+
+    from authentification.models import User
+    from reviews.seeding import seed_social_graph
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        seed_social_graph(users=users)
+        member = (User.objects.annotate(count=Count('following'))
+                  .order_by('-count').first())
+        client = Client()
+        client.force_login(member)
+
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            response = client.get(reverse('flux'))
+            timings.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.status_code
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    return {'startup': startup * 1000,
+            'first request': timings[0] * 1000,
+            'second request': timings[1] * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--child', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.users)))
+        return
+
+    print(f"{'profile':<12}{'startup':>14}{'1st request':>14}"
+          f"{'2nd request':>14}   (median ms of {args.runs} runs)")
+    for name, environment in PROFILES.items():
+        environment = {**os.environ,
+                       'DJANGO_SETTINGS_MODULE': 'LITRevu.settings',
+                       **environment}
+        runs = [
+            json.loads(subprocess.run(
+                [sys.executable, __file__, '--child',
+                 '--users', str(args.users)],
+                env=environment, check=True, capture_output=True, text=True,
+            ).stdout)
+            for _ in range(args.runs)
+        ]
+        print(f'{name:<12}' + ''.join(
+            f'{statistics.median(run[key] for run in runs):>14.1f}'
+            for key in ('startup', 'first request', 'second request')))
+
+
+if __name__ == '__main__':
+    main()
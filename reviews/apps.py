@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ReviewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reviews'
+
+    def ready(self):
+        # connects the receivers keeping the materialized timelines up to date
+        from . import signals  # noqa: F401
+        # and the one tuning the SQLite connections
+        from . import sqlite  # noqa: F401
@@ -0,0 +1,108 @@
+"""
+Async versions of the read-only feed views, for `LITRevu.asgi`.
+
+They are routed instead of the sync views of `views.py` when the
+`ASYNC_FEED_VIEWS` setting is enabled. The independent queries of a page
+are awaited together, and no worker thread is held while the database
+answers. The templates are still rendered by the sync `render`, in a
+thread, since they may evaluate lazy querysets.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.db.models import Q
+from django.shortcuts import render
+
+from authentification.models import User
+
+from . import views
+from .feed import Timeline, aflux_timeline, aset_viewer_flags
+from .forms import FollowUserForm
+from .models import Review, Ticket
+from .notifications import streams_events
+from .relations import (aget_follow_counts, ausers_page, followers_list,
+                        followings_list)
+from .views import FOLLOW_PAGE_SIZE, PAGE_SIZE
+
+arender = sync_to_async(render)
+
+
+async def viewer(request) -> User:
+    """
+    Returns the user of the request, also set as `request.user` so that the
+    templates do not load him a second time.
+    """
+    request.user = await request.auser()
+    return request.user
+
+
+@login_required
+async def flux(request):
+    """
+    Async version of `views.flux`. The offset `?page=` links are served by
+    the sync view.
+    """
+    if request.GET.get('page') is not None:
+        return await sync_to_async(views.flux)(request)
+
+    user = await viewer(request)
+    timeline = await aflux_timeline(user)
+    page_obj = await timeline.apage(request.GET.get('cursor'), PAGE_SIZE)
+    await aset_viewer_flags(page_obj.object_list, user)
+
+    return await arender(request,
+                         'reviews/flux.html',
+                         {'page_obj': page_obj,
+                          'notifications': streams_events(request)})
+
+
+@login_required
+async def user_posts(request):
+    """
+    Async version of `views.user_posts`.
+    """
+    user = await viewer(request)
+    reviews = Review.objects.filter(
+        Q(user=user) |
+        Q(ticket__user=user)
+    ).distinct()
+
+    tickets = Ticket.objects.filter(user=user)
+
+    page_obj = await Timeline(reviews, tickets).apage(
+        request.GET.get('cursor'), PAGE_SIZE)
+    await aset_viewer_flags(page_obj.object_list, user)
+
+    return await arender(request,
+                         'reviews/user_posts.html',
+                         {'page_obj': page_obj})
+
+
+@login_required
+async def follow(request):
+    """
+    Async version of `views.follow`, reading the pages of followers and
+    followings and their counters together. The follow form is posted to
+    the sync view.
+    """
+    if request.method == "POST":
+        return await sync_to_async(views.follow)(request)
+
+    user = await viewer(request)
+    followers_page, following_page, counts = await asyncio.gather(
+        ausers_page(followers_list(user),
+                    request.GET.get('followers_after'), FOLLOW_PAGE_SIZE),
+        ausers_page(followings_list(user),
+                    request.GET.get('following_after'), FOLLOW_PAGE_SIZE),
+        aget_follow_counts(user.id),
+    )
+
+    return await arender(request,
+                         'reviews/follow.html',
+                         {
+                             'form': FollowUserForm(current_user=user),
+                             'followers_page': followers_page,
+                             'following_page': following_page,
+                             'counts': counts,
+                         })
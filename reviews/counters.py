@@ -0,0 +1,102 @@
+from django.db.models import (Count, F, IntegerField, Min, OuterRef, Q,
+                              Subquery, Sum, Value)
+from django.db.models.functions import Coalesce, Now
+
+from .models import Review, Ticket
+
+
+def _reviews_of_ticket(aggregate, output_field=None) -> Subquery:
+    """
+    Builds the subquery computing an aggregate over the reviews of the
+    ticket being updated.
+    """
+    return Subquery(
+        Review.objects.filter(ticket=OuterRef('pk'))
+        .order_by().values('ticket')
+        .annotate(value=aggregate).values('value'),
+        output_field=output_field
+    )
+
+
+def add_review(review: Review) -> None:
+    """
+    Counts a new review in the denormalized fields of its ticket.
+
+    Like the other updates of this module, it changes `time_updated`, the
+    average rating being displayed on the cached card of the ticket.
+
+    The counters are incremented by the database, so concurrent reviews of
+    the same ticket are all counted.
+    """
+    Ticket.objects.filter(id=review.ticket_id).update(
+        review_count=F('review_count') + 1,
+        rating_total=F('rating_total') + review.rating,
+        first_review_at=Coalesce('first_review_at',
+                                 Value(review.time_created)),
+        time_updated=Now(),
+    )
+
+
+def remove_review(review: Review) -> None:
+    """
+    Removes a deleted review from the denormalized fields of its ticket.
+    The date of the first review is read again from the remaining ones.
+    """
+    Ticket.objects.filter(id=review.ticket_id).update(
+        review_count=F('review_count') - 1,
+        rating_total=F('rating_total') - review.rating,
+        first_review_at=_reviews_of_ticket(Min('time_created')),
+        time_updated=Now(),
+    )
+
+
+def update_rating(review: Review) -> None:
+    """
+    Sums again the ratings of the ticket of a modified review.
+    """
+    Ticket.objects.filter(id=review.ticket_id).update(
+        rating_total=Coalesce(
+            _reviews_of_ticket(Sum('rating'), IntegerField()), 0),
+        time_updated=Now(),
+    )
+
+
+def repair_ticket_counters(tickets=None) -> int:
+    """
+    Recomputes the denormalized review fields of tickets from their reviews.
+
+    To be run after rows were written without signals (bulk_create, raw SQL,
+    fixtures) or to check that the counters did not drift.
+
+    Args:
+        tickets (QuerySet): The tickets to repair, all of them by default.
+
+    Returns:
+        int: The number of tickets whose fields were wrong.
+    """
+    if tickets is None:
+        tickets = Ticket.objects.all()
+
+    count = _reviews_of_ticket(Count('id'), IntegerField())
+    total = _reviews_of_ticket(Sum('rating'), IntegerField())
+    first = _reviews_of_ticket(Min('time_created'))
+
+    wrong = tickets.annotate(
+        actual_count=Coalesce(count, 0),
+        actual_total=Coalesce(total, 0),
+        actual_first=first,
+    ).filter(
+        ~Q(review_count=F('actual_count'))
+        | ~Q(rating_total=F('actual_total'))
+        | Q(first_review_at__isnull=True, actual_first__isnull=False)
+        | Q(first_review_at__isnull=False, actual_first__isnull=True)
+        | Q(first_review_at__lt=F('actual_first'))
+        | Q(first_review_at__gt=F('actual_first'))
+    )
+
+    return Ticket.objects.filter(id__in=wrong.values('id')).update(
+        review_count=Coalesce(count, 0),
+        rating_total=Coalesce(total, 0),
+        first_review_at=first,
+        time_updated=Now(),
+    )
@@ -0,0 +1,135 @@
+from django.db import transaction
+
+from authentification.models import User
+
+from .feed import Timeline, flux_querysets
+from .models import Review, Ticket, TimelineEntry
+from .relations import get_relations
+
+# number of timeline entries inserted per query
+BATCH_SIZE = 1000
+
+
+def get_followers_ids(user_id: int) -> set:
+    """
+    Retrieves the ids of the users who have the given user in their
+    followings, that is who follow him without any ban between them.
+
+    Args:
+        user_id (int): The id of the followed user.
+
+    Returns:
+        set: The ids of the users whose feed shows the user's posts.
+    """
+    relations = get_relations(user_id)
+    return set(relations.followers - relations.banned)
+
+
+def get_blocked_ids(user_id: int) -> set:
+    """
+    Retrieves the ids of the users who have banned the given user or whom
+    he has banned.
+
+    Args:
+        user_id (int): The id of the user.
+
+    Returns:
+        set: The ids of the users with a ban in either direction.
+    """
+    relations = get_relations(user_id)
+    return set(relations.banned | relations.banning)
+
+
+def add_to_timelines(kind: str, item, owner_ids) -> None:
+    """
+    Copies a review or a ticket into the timelines of the given users.
+    """
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(owner_id=owner_id,
+                       kind=kind,
+                       item_id=item.id,
+                       time_created=item.time_created)
+         for owner_id in owner_ids],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def remove_from_timelines(kind: str, item_id: int) -> None:
+    """
+    Removes a deleted review or ticket from every timeline.
+    """
+    TimelineEntry.objects.filter(kind=kind, item_id=item_id).delete()
+
+
+def ticket_audience(ticket: Ticket) -> set:
+    """
+    Retrieves the ids of the users whose feed shows a ticket: its author
+    and his followers.
+    """
+    return {ticket.user_id} | get_followers_ids(ticket.user_id)
+
+
+def review_audience(review: Review) -> set:
+    """
+    Retrieves the ids of the users whose feed shows a review: its author,
+    the ticket's author and their followers, except for the users having a
+    ban with one of them.
+    """
+    authors = {review.user_id, review.ticket.user_id}
+
+    owner_ids = set(authors)
+    for author_id in authors:
+        owner_ids |= get_followers_ids(author_id)
+    for author_id in authors:
+        owner_ids -= get_blocked_ids(author_id)
+    return owner_ids
+
+
+def fan_out_ticket(ticket: Ticket) -> None:
+    """
+    Adds a new ticket to the timelines of its author and of his followers.
+    """
+    add_to_timelines(TimelineEntry.TICKET, ticket, ticket_audience(ticket))
+
+
+def fan_out_review(review: Review) -> None:
+    """
+    Adds a new review to the timelines of its audience, see
+    `review_audience`.
+    """
+    add_to_timelines(TimelineEntry.REVIEW, review, review_audience(review))
+
+
+@transaction.atomic
+def rebuild_timeline(user: User) -> int:
+    """
+    Recomputes the whole timeline of a user from the live relationships.
+
+    It is used after a change of the user's relationships and to fill the
+    timelines when the materialized timeline is enabled on existing data.
+
+    Args:
+        user (User): The owner of the timeline.
+
+    Returns:
+        int: The number of entries of the rebuilt timeline.
+    """
+    TimelineEntry.objects.filter(owner=user).delete()
+
+    rows = Timeline(*flux_querysets(user)).entries().iterator(
+        chunk_size=BATCH_SIZE)
+
+    batch, total = [], 0
+    for time_created, kind, item_id in rows:
+        batch.append(TimelineEntry(owner=user,
+                                   kind=kind,
+                                   item_id=item_id,
+                                   time_created=time_created))
+        if len(batch) == BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+
+    TimelineEntry.objects.bulk_create(batch)
+    return total + len(batch)
@@ -0,0 +1,504 @@
+import asyncio
+import binascii
+import hashlib
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import CharField, Q, QuerySet, Value
+
+from authentification.models import User
+
+from .models import Review, Ticket, TimelineEntry
+from .relations import Relations, aget_relations, get_relations
+from .templatetags.reviews_extras import get_posted_at_display
+
+REVIEW = TimelineEntry.REVIEW
+TICKET = TimelineEntry.TICKET
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+# the items of the timelines, with what their snippets display
+REVIEWS = Review.objects.select_related('user', 'ticket__user')
+TICKETS = Ticket.objects.select_related('user')
+
+
+async def empty() -> dict:
+    return {}
+
+
+def encode_cursor(row: tuple, direction: str) -> str:
+    """
+    Builds the opaque cursor pointing just after (or before) a timeline row.
+
+    Args:
+        row (tuple): The (time_created, kind, id) key of the row.
+        direction (str): NEXT for older rows, PREVIOUS for newer rows.
+
+    Returns:
+        str: An url-safe token to be sent back in `?cursor=`.
+    """
+    time_created, kind, pk = row
+    raw = f'{direction}|{time_created.isoformat()}|{kind}|{pk}'
+    return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """
+    Reads a cursor built by `encode_cursor`.
+
+    Args:
+        cursor (str): The token received in `?cursor=`.
+
+    Returns:
+        tuple: ((time_created, kind, id), direction), or None if the cursor
+        is invalid.
+    """
+    try:
+        raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        direction, time_created, kind, pk = raw.split('|')
+        time_created = datetime.fromisoformat(time_created)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+    if direction not in (NEXT, PREVIOUS) or kind not in (REVIEW, TICKET):
+        return None
+    return (time_created, kind, pk), direction
+
+
+class CursorPage:
+    """
+    A page of a timeline read with keyset pagination.
+
+    Unlike `django.core.paginator.Page`, it knows nothing about the total
+    number of items: it only tells whether there is something before and
+    after it, and the cursors to reach it.
+
+    Attributes:
+        object_list (list): The Review and Ticket instances of the page.
+        next_cursor (str): Cursor of the following (older) page, or None.
+        previous_cursor (str): Cursor of the preceding (newer) page, or None.
+        head_cursor (str): Cursor of the items newer than the first one of
+                           the page, even when there is none yet, or None
+                           for an empty page.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None,
+                 head_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.head_cursor = head_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class Timeline:
+    """
+    Lazy sequence of reviews and tickets sorted by creation date.
+
+    The merge is done by the database: both querysets are reduced to a
+    shared (time_created, kind, id) projection, combined with a UNION ALL
+    and ordered there. Slicing a timeline only fetches the rows of the
+    requested slice, which are then loaded as model instances with their
+    related objects.
+
+    It exposes `count()` and slicing, so it can be given directly to a
+    `Paginator`, and `page()` which reads a page after an opaque cursor on
+    the (time_created, kind, id) key, without counting nor offset.
+
+    Attributes:
+        reviews (QuerySet): The reviews to include in the timeline.
+        tickets (QuerySet): The tickets to include in the timeline.
+    """
+
+    ordering = ('-time_created', '-kind', '-id')
+
+    def __init__(self, reviews: QuerySet, tickets: QuerySet):
+        self.reviews = reviews
+        self.tickets = tickets
+
+    def entries(self, position=None, direction=NEXT) -> QuerySet:
+        """
+        Builds the UNION query of the timeline.
+
+        Args:
+            position (tuple): Optional (time_created, kind, id) key, only the
+                              rows after it in `direction` are returned.
+            direction (str): NEXT to read older rows (newest first),
+                             PREVIOUS to read newer rows (oldest first).
+
+        Returns:
+            QuerySet: (time_created, kind, id) tuples.
+        """
+        reviews = self._projection(self.reviews, REVIEW, position, direction)
+        tickets = self._projection(self.tickets, TICKET, position, direction)
+
+        ordering = self.ordering
+        if direction == PREVIOUS:
+            ordering = [field.lstrip('-') for field in ordering]
+        return reviews.union(tickets, all=True).order_by(*ordering)
+
+    @staticmethod
+    def _projection(queryset, kind, position, direction) -> QuerySet:
+        """
+        Reduces one side of the timeline to the shared projection, keeping
+        only the rows beyond `position` when one is given.
+        """
+        if position is not None:
+            time_created, position_kind, pk = position
+            older = direction == NEXT
+            lookup = 'lt' if older else 'gt'
+
+            # the kind is constant on this side, so the tie on time_created
+            # is decided by comparing it with the kind of the position
+            beyond = Q(**{f'time_created__{lookup}': time_created})
+            if kind == position_kind:
+                beyond |= Q(time_created=time_created,
+                            **{f'id__{lookup}': pk})
+            elif (kind < position_kind) == older:
+                beyond |= Q(time_created=time_created)
+            queryset = queryset.filter(beyond)
+
+        return (queryset.order_by()
+                .annotate(kind=Value(kind, output_field=CharField()))
+                .values_list('time_created', 'kind', 'id'))
+
+    def page(self, cursor: str = None, size: int = 6) -> CursorPage:
+        """
+        Reads one page of the timeline with keyset pagination.
+
+        Only `size + 1` rows are read, the extra one telling whether the
+        timeline goes on. An invalid cursor gives the first page.
+
+        Args:
+            cursor (str): The cursor received in `?cursor=`, if any.
+            size (int): The number of items of the page.
+
+        Returns:
+            CursorPage: The items of the page and the cursors around it.
+        """
+        position, direction = decode_cursor(cursor or '') or (None, NEXT)
+
+        rows = list(self.entries(position, direction)[:size + 1])
+        rows, cursors = self._bounds(rows, position, direction, size)
+        if not rows:
+            return CursorPage([])
+        return CursorPage(self.hydrate(rows), **cursors)
+
+    async def apage(self, cursor: str = None, size: int = 6) -> CursorPage:
+        """
+        Async version of `page`, for the async views.
+        """
+        position, direction = decode_cursor(cursor or '') or (None, NEXT)
+
+        rows = [row async for row
+                in self.entries(position, direction)[:size + 1]]
+        rows, cursors = self._bounds(rows, position, direction, size)
+        if not rows:
+            return CursorPage([])
+        return CursorPage(await self.ahydrate(rows), **cursors)
+
+    @staticmethod
+    def _bounds(rows, position, direction, size) -> tuple:
+        """
+        Keeps the rows of a page out of the `size + 1` rows read after the
+        position, in the newest first order.
+
+        Returns:
+            tuple: The rows, and the cursors around them.
+        """
+        has_more = len(rows) > size
+        rows = rows[:size]
+
+        if direction == PREVIOUS:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        if not rows:
+            return rows, {}
+        return rows, {
+            'next_cursor': encode_cursor(rows[-1], NEXT) if has_next else None,
+            'previous_cursor': (encode_cursor(rows[0], PREVIOUS)
+                                if has_previous else None),
+            'head_cursor': encode_cursor(rows[0], PREVIOUS),
+        }
+
+    def count(self) -> int:
+        return self.entries().count()
+
+    def count_newer(self, cursor: str = None) -> int:
+        """
+        Counts the items newer than a cursor, all of them when the cursor is
+        missing or invalid.
+
+        Args:
+            cursor (str): A cursor such as the `head_cursor` of a page.
+
+        Returns:
+            int: The number of items that a client displaying the page
+                 has not seen yet.
+        """
+        position, _ = decode_cursor(cursor or '') or (None, PREVIOUS)
+        return self.entries(position, PREVIOUS).count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.hydrate(self.entries()[key])
+        return self[key:key + 1][0]
+
+    @staticmethod
+    def hydrate(rows) -> list:
+        """
+        Loads the model instances of timeline rows, keeping their order.
+
+        Reviews come with their author and their ticket's author, tickets
+        with their author, so rendering the snippets needs no more queries.
+
+        Args:
+            rows (iterable): (time_created, kind, id) tuples.
+
+        Returns:
+            list: Review and Ticket instances in the order of the rows.
+        """
+        rows = list(rows)
+        review_ids = [pk for _, kind, pk in rows if kind == REVIEW]
+        ticket_ids = [pk for _, kind, pk in rows if kind == TICKET]
+
+        instances = {REVIEW: {}, TICKET: {}}
+        if review_ids:
+            instances[REVIEW] = REVIEWS.in_bulk(review_ids)
+        if ticket_ids:
+            instances[TICKET] = TICKETS.in_bulk(ticket_ids)
+
+        return [instances[kind][pk] for _, kind, pk in rows
+                if pk in instances[kind]]
+
+    @staticmethod
+    async def ahydrate(rows) -> list:
+        """
+        Async version of `hydrate`, loading the reviews and the tickets
+        concurrently.
+        """
+        review_ids = [pk for _, kind, pk in rows if kind == REVIEW]
+        ticket_ids = [pk for _, kind, pk in rows if kind == TICKET]
+
+        reviews, tickets = await asyncio.gather(
+            REVIEWS.ain_bulk(review_ids) if review_ids else empty(),
+            TICKETS.ain_bulk(ticket_ids) if ticket_ids else empty(),
+        )
+        instances = {REVIEW: reviews, TICKET: tickets}
+
+        return [instances[kind][pk] for _, kind, pk in rows
+                if pk in instances[kind]]
+
+
+class MaterializedTimeline(Timeline):
+    """
+    Timeline read from the precomputed `TimelineEntry` rows of a user.
+
+    The rows already hold the (time_created, kind, id) key of the items, so
+    a page is a single range scan on the owner index followed by the loading
+    of the page's instances.
+
+    Attributes:
+        owner (User): The user whose timeline is read.
+    """
+
+    def __init__(self, owner: User):
+        self.owner = owner
+
+    def entries(self, position=None, direction=NEXT) -> QuerySet:
+        entries = TimelineEntry.objects.filter(owner=self.owner)
+
+        if position is not None:
+            time_created, kind, pk = position
+            lookup = 'lt' if direction == NEXT else 'gt'
+            entries = entries.filter(
+                Q(**{f'time_created__{lookup}': time_created})
+                | Q(time_created=time_created, **{f'kind__{lookup}': kind})
+                | Q(time_created=time_created, kind=kind,
+                    **{f'item_id__{lookup}': pk})
+            )
+
+        ordering = ('-time_created', '-kind', '-item_id')
+        if direction == PREVIOUS:
+            ordering = [field.lstrip('-') for field in ordering]
+        return (entries.order_by(*ordering)
+                .values_list('time_created', 'kind', 'item_id'))
+
+
+def flux_querysets(user: User, relations: Relations = None) -> tuple:
+    """
+    Builds the querysets of the items displayed in the feed of a user.
+
+    The feed holds the tickets of the user and of those he follows, and the
+    reviews written by them or answering their tickets, without anything
+    from the users he has banned or who have banned him.
+
+    Args:
+        user (User): The owner of the feed.
+        relations (Relations): His relationships, read from the cache when
+                               they are not given.
+
+    Returns:
+        tuple: The reviews and the tickets querysets.
+    """
+    if relations is None:
+        relations = get_relations(user.id)
+    excluded_users = relations.banned | relations.banning
+    list_users = [user.id, *relations.following]
+
+    # list of reviews of the user and those he follows
+    reviews = (Review.objects.filter(
+        Q(user__in=list_users) |
+        Q(ticket__user__in=list_users))
+               .exclude(user__in=excluded_users)
+               .exclude(ticket__user__in=excluded_users)
+               )
+
+    # list of tickets of the user and those he follows
+    tickets = Ticket.objects.filter(user__in=list_users)
+
+    return reviews, tickets
+
+
+def flux_timeline(user: User) -> Timeline:
+    """
+    Returns the feed timeline of a user, read from the precomputed entries
+    when the `MATERIALIZED_TIMELINE` setting is enabled, built from the live
+    relationships otherwise.
+    """
+    if getattr(settings, 'MATERIALIZED_TIMELINE', False):
+        return MaterializedTimeline(user)
+    return Timeline(*flux_querysets(user))
+
+
+async def aflux_timeline(user: User) -> Timeline:
+    """
+    Async version of `flux_timeline`.
+    """
+    if getattr(settings, 'MATERIALIZED_TIMELINE', False):
+        return MaterializedTimeline(user)
+    return Timeline(*flux_querysets(user, await aget_relations(user.id)))
+
+
+def set_viewer_flags(items, user: User) -> None:
+    """
+    Sets on the items of a page the flags deciding which buttons the user
+    sees, so that the templates do no query nor membership test.
+
+    Tickets displayed inside a review have no button and get no flag.
+    Whether a ticket is answered is read from its `review_count`, the
+    tickets already reviewed by the user are found with a single query on
+    the answered tickets of the page.
+
+    Flags:
+        can_modify (bool): The item is the user's, and for a ticket, it has
+                           not been answered yet.
+        author_banned_me (bool): The author of the ticket has banned the
+                                 user.
+        can_answer (bool): The user can post a review on the ticket, he has
+                           not answered it yet and is not banned by its
+                           author.
+
+    Args:
+        items (list): The Review and Ticket instances of the page.
+        user (User): The user viewing the page.
+    """
+    answered = answered_ticket_ids(items)
+
+    reviewed_by_user = set()
+    if answered:
+        reviewed_by_user = set(Review.objects
+                               .filter(ticket__in=answered, user=user)
+                               .values_list('ticket', flat=True))
+
+    apply_viewer_flags(items, user, get_relations(user.id).banning,
+                       reviewed_by_user)
+
+
+async def aset_viewer_flags(items, user: User) -> None:
+    """
+    Async version of `set_viewer_flags`, reading the relationships and the
+    tickets reviewed by the user concurrently.
+    """
+    answered = answered_ticket_ids(items)
+
+    async def reviewed():
+        if not answered:
+            return set()
+        return {ticket_id async for ticket_id
+                in (Review.objects.filter(ticket__in=answered, user=user)
+                    .values_list('ticket', flat=True))}
+
+    relations, reviewed_by_user = await asyncio.gather(
+        aget_relations(user.id), reviewed())
+
+    apply_viewer_flags(items, user, relations.banning, reviewed_by_user)
+
+
+def answered_ticket_ids(items) -> list:
+    return [item.id for item in items
+            if isinstance(item, Ticket) and item.review_count]
+
+
+def apply_viewer_flags(items, user: User, banning, reviewed_by_user) -> None:
+    """
+    Sets the flags of `set_viewer_flags` from the users who have banned the
+    viewer and the tickets he has answered.
+    """
+    for item in items:
+        if isinstance(item, Review):
+            item.can_modify = item.user_id == user.id
+            continue
+
+        item.can_modify = item.user_id == user.id and not item.review_count
+        item.author_banned_me = item.user_id in banning
+        item.can_answer = (not item.author_banned_me
+                           and item.id not in reviewed_by_user)
+
+
+def page_etag(page: CursorPage, user: User, *variants) -> str:
+    """
+    Builds the ETag of a rendered page of items, from everything that
+    changes its rendering: the viewer, the versions of the items and of the
+    tickets shown inside the reviews, their relative dates, the viewer
+    flags set by `set_viewer_flags` and the next cursor.
+
+    Args:
+        page (CursorPage): The page, with its viewer flags.
+        user (User): The user viewing the page.
+        variants: Anything else changing the response, such as its format.
+
+    Returns:
+        str: The quoted ETag.
+    """
+    parts = [user.id, page.next_cursor, *variants]
+    for item in page:
+        parts += [type(item).__name__, item.id, item.time_updated,
+                  get_posted_at_display(item.time_created),
+                  item.can_modify, getattr(item, 'can_answer', None)]
+        if isinstance(item, Review):
+            parts += [item.ticket.time_updated,
+                      get_posted_at_display(item.ticket.time_created)]
+
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False)
+    return f'"{digest.hexdigest()}"'
@@ -0,0 +1,188 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from authentification.models import User
+
+from . import fanout
+from .models import UserFollows
+from .relations import followable_users, get_relations, invalidate_relations
+
+FOLLOW = 'follow'
+UNFOLLOW = 'unfollow'
+BAN = 'ban'
+UNBAN = 'unban'
+ACTIONS = (FOLLOW, UNFOLLOW, BAN, UNBAN)
+
+# number of relationships written per query
+BATCH_SIZE = 1000
+
+# number of users of a batch sent to the `bulk_follows` view
+MAX_BATCH = 10000
+
+logger = logging.getLogger(__name__)
+
+# set while a batch is written, the receivers of `signals.py` then leave
+# the invalidations and the timeline rebuilds to the end of the batch
+batch_in_progress = ContextVar('batch_in_progress', default=False)
+
+_executor = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Returns the thread rebuilding the timelines of the other users of the
+    batches sent to the `bulk_follows` view, created on first use.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1,
+                                       thread_name_prefix='timelines')
+    return _executor
+
+
+@contextmanager
+def relationships_batch(user: User, user_ids, in_background=False):
+    """
+    Writes the relationships of a user with many others in one transaction,
+    and refreshes what depends on them once for the whole batch: the cached
+    relationships and counters, and the materialized timelines.
+
+    Args:
+        user (User): The user whose relationships change.
+        user_ids (iterable): The other users of the relationships.
+        in_background (bool): Rebuild the timelines of the other users in a
+            background thread, only the user's own one being rebuilt before
+            returning. A stopped process leaves them to the
+            `rebuild_timelines` command.
+    """
+    others = set(user_ids) - {user.id}
+
+    token = batch_in_progress.set(True)
+    try:
+        with transaction.atomic():
+            yield
+            invalidate_relations(user.id, *others)
+            transaction.on_commit(lambda: refresh_relationships(
+                user.id, others, in_background))
+    finally:
+        batch_in_progress.reset(token)
+
+
+def refresh_relationships(user_id: int, others, in_background=False) -> None:
+    invalidate_relations(user_id, *others)
+    if getattr(settings, 'MATERIALIZED_TIMELINE', False):
+        if in_background:
+            rebuild_timelines([user_id])
+            get_executor().submit(run_rebuilds, others)
+        else:
+            rebuild_timelines([user_id, *others])
+
+
+def rebuild_timelines(user_ids) -> None:
+    for user in User.objects.filter(id__in=user_ids).iterator():
+        fanout.rebuild_timeline(user)
+
+
+def run_rebuilds(user_ids) -> None:
+    """
+    Rebuilds timelines in the background thread, with its own database
+    connection.
+    """
+    close_old_connections()
+    try:
+        rebuild_timelines(user_ids)
+    except Exception:
+        logger.exception("Rebuild of %s timelines failed", len(user_ids))
+    finally:
+        close_old_connections()
+
+
+def follow_users(user: User, user_ids, in_background=False) -> int:
+    """
+    Makes a user follow many others, skipping those he cannot follow (see
+    `followable_users`), among them those he already follows or bans.
+
+    Returns:
+        int: The number of users followed, not counting those skipped.
+    """
+    ids = list(followable_users(user).filter(id__in=user_ids)
+               .values_list('id', flat=True))
+    with relationships_batch(user, ids, in_background):
+        UserFollows.objects.bulk_create(
+            [UserFollows(user=user, followed_user_id=user_id)
+             for user_id in ids],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True
+        )
+    return len(ids)
+
+
+def unfollow_users(user: User, user_ids, in_background=False) -> int:
+    """
+    Makes a user stop following many others, except those who have banned
+    him, as the `unfollow` view does.
+
+    Returns:
+        int: The number of users unfollowed.
+    """
+    ids = set(user_ids) - get_relations(user.id).banning
+    with relationships_batch(user, ids, in_background):
+        count, _ = UserFollows.objects.filter(
+            user=user, followed_user__in=ids, banned=False).delete()
+    return count
+
+
+def ban_users(user: User, user_ids, in_background=False) -> int:
+    """
+    Makes a user ban many others: his existing follows of them become bans
+    with a single update, the missing bans are inserted.
+
+    Returns:
+        int: The number of users banned, not counting those already banned.
+    """
+    ids = set(User.objects.filter(id__in=user_ids).exclude(id=user.id)
+              .values_list('id', flat=True))
+    with relationships_batch(user, ids, in_background):
+        existing = set(UserFollows.objects.filter(
+            user=user, followed_user__in=ids)
+            .values_list('followed_user_id', flat=True))
+        updated = UserFollows.objects.filter(
+            user=user, followed_user__in=existing,
+            banned=False).update(banned=True)
+        UserFollows.objects.bulk_create(
+            [UserFollows(user=user, followed_user_id=user_id, banned=True)
+             for user_id in ids - existing],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True
+        )
+    return updated + len(ids - existing)
+
+
+def unban_users(user: User, user_ids, in_background=False) -> int:
+    """
+    Lifts the bans of a user on many others, as the `unban_followers` view
+    does.
+
+    Returns:
+        int: The number of users unbanned.
+    """
+    ids = set(user_ids)
+    with relationships_batch(user, ids, in_background):
+        count, _ = UserFollows.objects.filter(
+            user=user, followed_user__in=ids, banned=True).delete()
+    return count
+
+
+def apply(action: str, user: User, user_ids, in_background=False) -> int:
+    """
+    Runs one of the `ACTIONS` on a batch of users.
+    """
+    return {FOLLOW: follow_users,
+            UNFOLLOW: unfollow_users,
+            BAN: ban_users,
+            UNBAN: unban_users}[action](user, user_ids, in_background)
@@ -1,7 +1,8 @@
 from django import forms
 
-from authentification.models import User
+from reviews import follows
 from reviews.models import Ticket, Review
+from reviews.relations import followable_users
 
 
 class TicketForm(forms.ModelForm):
@@ -59,49 +60,62 @@ class FollowUserForm(forms.Form):
     """
     Form for following another user.
 
-    This form allows users to search for and follow another user by selecting
-    their username from a dropdown list.
+    This form allows users to search for another user by the beginning of
+    his username, with the `search_users` endpoint, and to follow him. Only
+    the id of the chosen user is submitted, and validated with a single
+    query.
 
     Attributes:
         current_user (User): The user who is initiating the follow action.
     """
+    user = forms.IntegerField(widget=forms.HiddenInput)
 
     def __init__(self, *args, **kwargs):
         self.current_user = kwargs.pop('current_user',
                                        None)  # Extract user from kwargs
         super().__init__(*args, **kwargs)
-        self.fields['user'] = forms.ModelChoiceField(
-            queryset=self.filter_users(),
-            label="Sélectionner un utilisateur",
-            widget=forms.Select(attrs={'class': 'form-control'}),
-        )
 
-    def filter_users(self):
+    def clean_user(self):
         """
-        Selects users to be displayed in the dropdown menu.
+        Checks that the submitted user can be followed by the current user.
 
-        Excludes from the list:
-            - Users that the current user is already following.
-            - Users who have blocked the current user.
+        Returns:
+            User: The user to follow.
+        """
+        user = followable_users(self.current_user).filter(
+            id=self.cleaned_data['user']).first()
+        if user is None:
+            raise forms.ValidationError(
+                "Cet utilisateur ne peut pas être suivi.")
+        return user
+
+
+class BulkFollowForm(forms.Form):
+    """
+    Form of a batch of follows, unfollows, bans or unbans.
+
+    Attributes:
+        action (ChoiceField): One of `follows.ACTIONS`.
+        user_ids (CharField): The ids of the users, separated by commas,
+                              spaces or new lines.
+    """
+    action = forms.ChoiceField(choices=[(action, action)
+                                        for action in follows.ACTIONS])
+    user_ids = forms.CharField(widget=forms.Textarea)
+
+    def clean_user_ids(self):
+        """
+        Reads the ids of the users, at most `MAX_BATCH` of them.
 
         Returns:
-            QuerySet: A list of users that the current user can follow, excluding
-            admin users and the current user.
+            list: The ids, without duplicates.
         """
-        following_users = User.objects.filter(
-            followers__user=self.current_user
-                                           )
-        banning_users = User.objects.filter(
-            following__followed_user=self.current_user,
-            following__banned=True)
-
-        excluded_users = following_users.union(
-            banning_users).values_list('id', flat=True)
-
-        user_to_follow = (
-            User.objects.all().exclude(username='admin')
-            .exclude(username=self.current_user)
-            .exclude(id__in=excluded_users)
-        )
-
-        return user_to_follow
+        try:
+            ids = {int(user_id) for user_id
+                   in self.cleaned_data['user_ids'].replace(',', ' ').split()}
+        except ValueError:
+            raise forms.ValidationError("Identifiant d'utilisateur invalide.")
+        if len(ids) > follows.MAX_BATCH:
+            raise forms.ValidationError(
+                f"Au plus {follows.MAX_BATCH} utilisateurs par lot.")
+        return sorted(ids)
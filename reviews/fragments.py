@@ -0,0 +1,34 @@
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+
+# names of the `{% cache %}` blocks of the ticket and review snippets
+TICKET_FRAGMENT = 'ticket_card'
+REVIEW_FRAGMENT = 'review_card'
+
+
+def fragments_cache():
+    """
+    Returns the cache used by the `{% cache %}` template tag: the
+    'template_fragments' alias when it is defined, 'default' otherwise.
+    """
+    try:
+        return caches['template_fragments']
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def fragment_key(name: str, instance) -> str:
+    """
+    Returns the key of the cached card of a ticket or a review, which
+    varies on its id and its `time_updated` version, as in the snippets.
+    """
+    return make_template_fragment_key(
+        name, [instance.id, instance.time_updated])
+
+
+def invalidate_fragment(name: str, instance) -> None:
+    """
+    Drops the cached card of a ticket or a review, in the version held by
+    the instance.
+    """
+    fragments_cache().delete(fragment_key(name, instance))
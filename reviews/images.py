@@ -0,0 +1,271 @@
+import base64
+import hashlib
+import io
+import logging
+import os
+import textwrap
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.db.models.functions import Now
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# directory of the media storage holding the default covers
+COVERS_DIRECTORY = 'covers'
+
+# to be changed with the drawing of the covers, so that none is reused
+COVER_VERSION = 1
+
+# to be changed with the making of the derivatives, so that all are remade
+DERIVATIVES_VERSION = 1
+
+_executor = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Returns the pool of threads converting the uploaded pictures, created on
+    first use with `IMAGE_PROCESSING_WORKERS` threads.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            thread_name_prefix='image-processing'
+        )
+    return _executor
+
+
+def derivatives_signature() -> str:
+    """
+    Returns the settings the derivatives are made with, stored in their
+    manifest to know whether they are up to date.
+    """
+    return ':'.join(map(str, (
+        DERIVATIVES_VERSION,
+        sorted(settings.IMAGE_DERIVATIVE_WIDTHS),
+        settings.IMAGE_DERIVATIVE_QUALITY,
+        settings.IMAGE_PLACEHOLDER_WIDTH,
+    )))
+
+
+def make_derivatives(name: str) -> dict:
+    """
+    Makes the responsive versions of a stored picture.
+
+    The picture is resized to each width of `IMAGE_DERIVATIVE_WIDTHS`,
+    keeping its aspect ratio and without enlarging it: the widths larger
+    than the upload are replaced by its own width. The versions are encoded
+    as lossy WebP with the `IMAGE_DERIVATIVE_QUALITY` quality. A tiny
+    blurred version, `IMAGE_PLACEHOLDER_WIDTH` pixels wide, is inlined as a
+    data URI to be displayed while the picture loads.
+
+    Args:
+        name (str): The name of the original picture in the media storage.
+
+    Returns:
+        dict: The manifest of the derivatives: the original picture and the
+        hash of its content, the signature of the settings, the sources
+        (name, width and height, smallest first) and the placeholder.
+    """
+    with default_storage.open(name, 'rb') as original:
+        content = original.read()
+
+    with Image.open(io.BytesIO(content)) as img:
+        img = ImageOps.exif_transpose(img)
+        img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+
+        stem = os.path.splitext(name)[0]
+        sources = []
+        widths = [width for width in sorted(settings.IMAGE_DERIVATIVE_WIDTHS)
+                  if width < img.width]
+        if len(widths) < len(settings.IMAGE_DERIVATIVE_WIDTHS):
+            # narrower than the widest version: the last one keeps the
+            # width of the upload
+            widths.append(img.width)
+        for width in widths:
+            height = max(1, round(img.height * width / img.width))
+
+            source_name = default_storage.get_available_name(
+                f'{stem}-{width}w.webp')
+            img.resize((width, height), Image.Resampling.LANCZOS).save(
+                default_storage.path(source_name), 'WEBP',
+                quality=settings.IMAGE_DERIVATIVE_QUALITY)
+            sources.append({'name': source_name,
+                            'width': width,
+                            'height': height})
+
+        width = settings.IMAGE_PLACEHOLDER_WIDTH
+        placeholder = io.BytesIO()
+        (img.resize((width, max(1, round(img.height * width / img.width))))
+         .filter(ImageFilter.GaussianBlur(1))
+         .save(placeholder, 'WEBP', quality=30))
+
+    return {
+        'original': name,
+        'original_hash': hashlib.sha256(content).hexdigest(),
+        'signature': derivatives_signature(),
+        'sources': sources,
+        'placeholder': 'data:image/webp;base64,'
+                       + base64.b64encode(placeholder.getvalue()).decode(),
+    }
+
+
+def delete_derivatives(manifest: dict) -> None:
+    """
+    Deletes the files of the derivatives of a manifest, not its original.
+    """
+    for source in manifest.get('sources', []):
+        default_storage.delete(source['name'])
+
+
+def delete_picture(name: str, manifest: dict) -> None:
+    """
+    Deletes the files of a removed or replaced picture: its derivatives,
+    and its original unless another ticket still shows it.
+    """
+    from .models import Ticket
+
+    delete_derivatives(manifest)
+    original = manifest.get('original', name)
+    if not Ticket.objects.filter(
+            Q(picture=original)
+            | Q(picture_derivatives__original=original)).exists():
+        default_storage.delete(original)
+
+
+def process_ticket_picture(ticket_id: int) -> None:
+    """
+    Makes the derivatives of the uploaded picture of a ticket and swaps
+    them in.
+
+    The ticket row is updated without calling `Ticket.save`, and only if
+    its picture has not been replaced meanwhile. The upload is kept as the
+    original of the derivatives, and the smallest derivative becomes the
+    ticket's picture.
+
+    Args:
+        ticket_id (int): The id of the ticket.
+    """
+    from .models import Ticket
+
+    ticket = Ticket.objects.filter(id=ticket_id).first()
+    if ticket is None or not ticket.picture_processing:
+        return
+
+    raw_name = ticket.picture.name
+    try:
+        manifest = make_derivatives(raw_name)
+    except (OSError, ValueError):
+        logger.exception("Picture of ticket %s can't be converted", ticket_id)
+        Ticket.objects.filter(id=ticket_id, picture=raw_name).update(
+            picture=None, picture_processing=False, time_updated=Now())
+        return
+
+    updated = Ticket.objects.filter(id=ticket_id, picture=raw_name).update(
+        picture=manifest['sources'][0]['name'],
+        picture_derivatives=manifest,
+        picture_processing=False,
+        time_updated=Now())
+
+    if not updated:
+        delete_derivatives(manifest)
+        default_storage.delete(raw_name)
+
+
+def run_job(ticket_id: int) -> None:
+    """
+    Runs the processing of a picture in a worker thread, with its own
+    database connection.
+    """
+    close_old_connections()
+    try:
+        process_ticket_picture(ticket_id)
+    except Exception:
+        logger.exception("Processing of ticket %s failed", ticket_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_ticket_picture(ticket_id: int) -> None:
+    """
+    Queues the processing of a ticket's picture once the current
+    transaction is committed.
+
+    With `IMAGE_PROCESSING_WORKERS = 0` the picture is processed in the
+    calling thread, which is what the tests and the management commands use.
+
+    Args:
+        ticket_id (int): The id of the ticket.
+    """
+    if settings.IMAGE_PROCESSING_WORKERS:
+        callback = partial(get_executor().submit, run_job, ticket_id)
+    else:
+        callback = partial(process_ticket_picture, ticket_id)
+
+    transaction.on_commit(callback)
+
+
+def cover_digest(title: str) -> str:
+    """
+    Returns the key of the default cover of a title.
+    """
+    return hashlib.sha256(
+        f'{COVER_VERSION}:{title}'.encode()).hexdigest()[:32]
+
+
+def draw_cover(title: str, size: tuple) -> Image.Image:
+    """
+    Draws a default cover: the title written on a grey background.
+    """
+    image = Image.new("RGBA", size, (204, 204, 204, 255))
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+
+    lines = textwrap.wrap(title, width=15)
+    y = (size[1] - len(lines) * 12) // 2  # Centrage vertical
+
+    for line in lines:
+        x = (size[0] - len(line) * 6) // 2  # Centrage horizontal approché
+        draw.text((x, y), line, font=font, fill="black")
+        y += 12
+
+    return image
+
+
+def get_cover(title: str, size: tuple) -> str:
+    """
+    Returns the path of the default cover of a title, drawing it the first
+    time. Covers are stored by digest, so identical titles share one file.
+
+    Args:
+        title (str): The title written on the cover.
+        size (tuple): The (width, height) of the cover.
+
+    Returns:
+        str: The path of the WebP cover.
+    """
+    path = cover_path(cover_digest(title))
+
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # written aside then renamed, a concurrent request never reads a
+        # partial file
+        temporary_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        draw_cover(title, size).save(temporary_path, "WEBP", lossless=True)
+        os.replace(temporary_path, path)
+
+    return path
+
+
+def cover_path(digest: str) -> str:
+    return default_storage.path(
+        os.path.join(COVERS_DIRECTORY, f'{digest}.webp'))
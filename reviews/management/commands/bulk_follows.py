@@ -0,0 +1,64 @@
+import sys
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authentification.models import User
+from reviews import follows
+
+
+class Command(BaseCommand):
+    """
+    Follows, unfollows, bans or unbans many users on behalf of a user.
+
+    The ids are read from the command line, or one per line from a file
+    (`-` for the standard input), and applied by batches of --batch-size
+    users, each written in one transaction, see `reviews/follows.py`.
+    """
+    help = "Change the relationships of a user with many others at once."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username',
+                            help="The user whose relationships change.")
+        parser.add_argument('action', choices=follows.ACTIONS)
+        parser.add_argument('user_ids', nargs='*', type=int,
+                            help="The ids of the other users.")
+        parser.add_argument('--file',
+                            help="A file of user ids, one per line.")
+        parser.add_argument('--batch-size', type=int,
+                            default=follows.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user {options['username']!r}.")
+
+        ids = iter(options['user_ids'])
+        if options['file']:
+            ids = self.read_ids(options['file'])
+
+        batches = changed = 0
+        while batch := list(islice(ids, options['batch_size'])):
+            changed += follows.apply(options['action'], user, batch)
+            batches += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f"batch {batches}: {changed} changed")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['action']}: {changed} relationships changed in "
+            f"{batches} batches."))
+
+    @staticmethod
+    def read_ids(path: str):
+        file = sys.stdin if path == '-' else open(path)
+        try:
+            for line in file:
+                if line.strip():
+                    try:
+                        yield int(line)
+                    except ValueError:
+                        raise CommandError(f"Invalid user id {line!r}.")
+        finally:
+            if file is not sys.stdin:
+                file.close()
@@ -0,0 +1,34 @@
+import gzip
+import sys
+
+from django.core.management.base import BaseCommand
+
+from reviews.snapshots import BATCH_SIZE, export_snapshot
+
+
+class Command(BaseCommand):
+    """
+    Exports the users, tickets, reviews and follows as JSON lines, read by
+    chunks so that the memory used stays the same whatever the size of the
+    database. A path ending with `.gz` is compressed.
+    """
+    help = "Export the LITRevu data as a stream of JSON lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-',
+                            help="The output file, the standard output "
+                                 "by default.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if path == '-':
+            counts = export_snapshot(sys.stdout, options['batch_size'])
+        else:
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'wt', encoding='utf-8') as stream:
+                counts = export_snapshot(stream, options['batch_size'])
+
+        self.stderr.write(self.style.SUCCESS(
+            "Exported " + ', '.join(f"{count} {name}s"
+                                    for name, count in counts.items())))
@@ -0,0 +1,53 @@
+import gzip
+import sys
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.snapshots import BATCH_SIZE, import_snapshot
+
+
+class Command(BaseCommand):
+    """
+    Imports a snapshot written by `export_litrevu`, with chunked bulk
+    inserts in one transaction, in constant memory.
+
+    The uploaded pictures without derivatives are converted after the
+    import, unless --skip-images is given.
+    """
+    help = "Import the LITRevu data from a stream of JSON lines."
+    stealth_options = ('stdin',)
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-',
+                            help="The snapshot, the standard input by "
+                                 "default. A path ending with .gz is "
+                                 "decompressed.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--skip-images', action='store_true',
+                            help="Do not convert the pictures, "
+                                 "`reprocess_covers` can do it later.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        process_images = not options['skip_images']
+        try:
+            if path == '-':
+                counts = import_snapshot(options.get('stdin', sys.stdin),
+                                         options['batch_size'],
+                                         process_images)
+            else:
+                opener = gzip.open if path.endswith('.gz') else open
+                with opener(path, 'rt', encoding='utf-8') as stream:
+                    counts = import_snapshot(stream, options['batch_size'],
+                                             process_images)
+        except ValueError as error:
+            raise CommandError(error)
+
+        self.stdout.write(self.style.SUCCESS(
+            "Imported " + ', '.join(f"{count} {name}s"
+                                    for name, count in counts.items())))
+
+        if process_images:
+            call_command('process_pending_images', stdout=self.stdout,
+                         verbosity=options['verbosity'])
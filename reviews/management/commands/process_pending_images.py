@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from reviews.images import process_ticket_picture
+from reviews.models import Ticket
+
+
+class Command(BaseCommand):
+    """
+    Converts the uploaded pictures still waiting for their processing.
+
+    The processing threads keep their queue in memory, so the pictures of a
+    server stopped before processing them stay flagged `picture_processing`
+    until this command is run. The tickets are read by chunks of increasing
+    id, as processing a picture updates the rows being read.
+    """
+    help = "Convert the ticket pictures left waiting for processing."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=200,
+                            help="Number of tickets read per query.")
+
+    def handle(self, *args, **options):
+        count = last_id = 0
+        while True:
+            ticket_ids = list(
+                Ticket.objects.filter(id__gt=last_id, picture_processing=True)
+                .order_by('id').values_list('id', flat=True)
+                [:options['chunk_size']])
+            if not ticket_ids:
+                break
+
+            for ticket_id in ticket_ids:
+                process_ticket_picture(ticket_id)
+                count += 1
+            last_id = ticket_ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"{count} pictures processed."))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from authentification.models import User
+from reviews.fanout import rebuild_timeline
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the materialized timelines from the live relationships.
+
+    To be run once when the `MATERIALIZED_TIMELINE` setting is enabled on an
+    existing database, or after loading fixtures.
+    """
+    help = "Rebuild the precomputed home timelines of the users."
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int,
+                            help="Only rebuild the timelines of these users.")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['user_ids']:
+            users = users.filter(id__in=options['user_ids'])
+
+        count = entries = 0
+        for user in users.iterator():
+            entries += rebuild_timeline(user)
+            count += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{user.username}: timeline rebuilt")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{count} timelines rebuilt, {entries} entries."))
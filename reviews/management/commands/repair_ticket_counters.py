@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from reviews.counters import repair_ticket_counters
+from reviews.models import Ticket
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the review counters of the tickets from their reviews.
+
+    To be run after loading fixtures or writing reviews without signals.
+    Only the tickets whose counters are wrong are updated.
+    """
+    help = "Repair the review count, rating total and first review date of " \
+           "the tickets."
+
+    def add_arguments(self, parser):
+        parser.add_argument('ticket_ids', nargs='*', type=int,
+                            help="Only repair these tickets.")
+
+    def handle(self, *args, **options):
+        tickets = Ticket.objects.all()
+        if options['ticket_ids']:
+            tickets = tickets.filter(id__in=options['ticket_ids'])
+
+        repaired = repair_ticket_counters(tickets)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{repaired} tickets repaired."))
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models.functions import Now
+
+from reviews.images import (delete_derivatives, derivatives_signature,
+                            make_derivatives)
+from reviews.models import Ticket
+
+# file of the media storage holding the progress of the last run
+CHECKPOINT = '.reprocess_covers'
+
+
+def reprocess(ticket_id: int, original: str, manifest: dict):
+    """
+    Remakes the derivatives of a ticket's picture, in a worker process.
+
+    The picture is skipped when its manifest was made with the current
+    settings from an original whose content has not changed.
+
+    Returns:
+        tuple: The ticket id and the new manifest, None if skipped, False if
+        the original can't be read.
+    """
+    try:
+        with default_storage.open(original, 'rb') as file:
+            original_hash = hashlib.sha256(file.read()).hexdigest()
+
+        if (manifest.get('original_hash') == original_hash
+                and manifest.get('signature') == derivatives_signature()):
+            return ticket_id, None
+        return ticket_id, make_derivatives(original)
+    except (OSError, ValueError):
+        return ticket_id, False
+
+
+class InlineExecutor:
+    """
+    Runs the jobs in the current process, for `--workers 0`.
+    """
+
+    def map(self, function, *iterables):
+        return map(function, *iterables)
+
+    def shutdown(self):
+        pass
+
+
+class Command(BaseCommand):
+    """
+    Remakes the derivatives of the ticket pictures with the current image
+    settings.
+
+    Tickets are read by chunks of increasing id and their pictures are
+    processed by a pool of processes. A picture whose original and settings
+    have not changed is skipped. The last completed chunk is saved in a
+    checkpoint, so an interrupted run resumes where it stopped.
+    """
+    help = "Remake the responsive versions of the ticket pictures."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=200,
+                            help="Number of tickets read per query.")
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help="Number of processes, 0 to process the "
+                                 "pictures in this one.")
+        parser.add_argument('--restart', action='store_true',
+                            help="Ignore the checkpoint of a previous run.")
+
+    def handle(self, *args, **options):
+        signature = derivatives_signature()
+        last_id = 0 if options['restart'] else self.read_checkpoint(signature)
+        if last_id:
+            self.stdout.write(f"Resuming after ticket {last_id}.")
+
+        if options['workers']:
+            # the processes must not share the database connections
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=options['workers'],
+                                           initializer=django.setup)
+        else:
+            executor = InlineExecutor()
+
+        counts = {'processed': 0, 'skipped': 0, 'failed': 0}
+        start = time.perf_counter()
+        try:
+            while True:
+                tickets = list(
+                    Ticket.objects.filter(id__gt=last_id,
+                                          picture_processing=False)
+                    .exclude(picture='').exclude(picture__isnull=True)
+                    .order_by('id')
+                    .values_list('id', 'picture', 'picture_derivatives')
+                    [:options['chunk_size']])
+                if not tickets:
+                    break
+
+                self.process_chunk(executor, tickets, counts)
+                last_id = tickets[-1][0]
+                self.write_checkpoint(signature, last_id)
+
+                elapsed = time.perf_counter() - start
+                done = sum(counts.values())
+                self.stdout.write(
+                    f"{done} pictures ({counts['processed']} processed, "
+                    f"{counts['skipped']} skipped, {counts['failed']} "
+                    f"failed), {done / elapsed:.1f} pictures/s")
+        finally:
+            executor.shutdown()
+
+        default_storage.delete(CHECKPOINT)
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts['processed']} pictures processed, "
+            f"{counts['skipped']} skipped, {counts['failed']} failed in "
+            f"{time.perf_counter() - start:.1f}s."))
+
+    def process_chunk(self, executor, tickets, counts):
+        """
+        Processes the pictures of a chunk of tickets and swaps the new
+        derivatives in, deleting the former ones.
+        """
+        jobs = [(ticket_id, manifest.get('original', picture), manifest)
+                for ticket_id, picture, manifest in tickets]
+        pictures = {ticket_id: (picture, manifest)
+                    for ticket_id, picture, manifest in tickets}
+
+        results = executor.map(reprocess, *zip(*jobs))
+        for ticket_id, new_manifest in results:
+            if new_manifest is None:
+                counts['skipped'] += 1
+                continue
+            if new_manifest is False:
+                counts['failed'] += 1
+                continue
+
+            picture, manifest = pictures[ticket_id]
+            updated = Ticket.objects.filter(
+                id=ticket_id, picture=picture).update(
+                picture=new_manifest['sources'][0]['name'],
+                picture_derivatives=new_manifest,
+                time_updated=Now())
+
+            # the picture may have been replaced since the chunk was read
+            delete_derivatives(manifest if updated else new_manifest)
+            counts['processed'] += 1
+
+    @staticmethod
+    def read_checkpoint(signature: str) -> int:
+        """
+        Returns the last ticket id completed by an interrupted run made with
+        the same settings, 0 otherwise.
+        """
+        if not default_storage.exists(CHECKPOINT):
+            return 0
+        with default_storage.open(CHECKPOINT, 'r') as file:
+            saved_signature, _, last_id = file.read().rpartition('\n')
+        return int(last_id) if saved_signature == signature else 0
+
+    @staticmethod
+    def write_checkpoint(signature: str, last_id: int) -> None:
+        path = default_storage.path(CHECKPOINT)
+        with open(f'{path}.tmp', 'w') as file:
+            file.write(f'{signature}\n{last_id}')
+        os.replace(f'{path}.tmp', path)
@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.seeding import seed_social_graph
+
+
+class Command(BaseCommand):
+    """
+    Fills the database with a synthetic social graph, to reproduce locally
+    the amount and the shape of the production data.
+
+    The graph is written with `bulk_create` by `seed_social_graph`, see
+    `reviews/seeding.py`; the materialized timelines are rebuilt afterwards
+    when the `MATERIALIZED_TIMELINE` setting is enabled. Every seeded user
+    has the same --password, for the load tests.
+
+        python manage.py seed_litrevu --users 10000 --follower-exponent 1.2
+    """
+    help = "Seed the database with a random social graph of members."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--follows-per-user', type=int, default=20,
+                            help="The average number of users followed.")
+        parser.add_argument('--follower-exponent', type=float, default=1.0,
+                            help="The exponent of the power law of the "
+                                 "followers, 0 for a uniform graph.")
+        parser.add_argument('--ban-ratio', type=float, default=0.05,
+                            help="The share of follows turned into bans.")
+        parser.add_argument('--tickets-per-user', type=int, default=3)
+        parser.add_argument('--reviews-per-user', type=int, default=3)
+        parser.add_argument('--poster-exponent', type=float, default=1.0,
+                            help="The exponent of the power law of the "
+                                 "posts, 0 for the same average for all.")
+        parser.add_argument('--image-ratio', type=float, default=0.7,
+                            help="The share of tickets with a picture.")
+        parser.add_argument('--days', type=int, default=365,
+                            help="The period over which posts are spread.")
+        parser.add_argument('--prefix', default='member')
+        parser.add_argument('--password', default='Invit1234')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        for ratio in ('ban_ratio', 'image_ratio'):
+            if not 0 <= options[ratio] <= 1:
+                raise CommandError(f"--{ratio.replace('_', '-')} must be "
+                                   f"between 0 and 1.")
+        for exponent in ('follower_exponent', 'poster_exponent'):
+            if options[exponent] < 0:
+                raise CommandError(f"--{exponent.replace('_', '-')} must "
+                                   f"not be negative.")
+
+        counts = seed_social_graph(
+            users=options['users'],
+            follows_per_user=options['follows_per_user'],
+            ban_ratio=options['ban_ratio'],
+            tickets_per_user=options['tickets_per_user'],
+            reviews_per_user=options['reviews_per_user'],
+            password=options['password'],
+            prefix=options['prefix'],
+            days=options['days'],
+            seed=options['seed'],
+            follower_exponent=options['follower_exponent'],
+            poster_exponent=options['poster_exponent'],
+            image_ratio=options['image_ratio'],
+        )
+        if getattr(settings, 'MATERIALIZED_TIMELINE', False):
+            call_command('rebuild_timelines', stdout=self.stdout)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts['users']} users, {counts['follows']} follows "
+            f"({counts['bans']} bans), {counts['tickets']} tickets "
+            f"({counts['pictures']} with a picture), {counts['reviews']} "
+            f"reviews."))
@@ -0,0 +1,71 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .routers import replica_alias, use_replica
+
+# cookie keeping a client on the primary database after a write
+PIN_COOKIE = 'primary_pin'
+
+
+class ReplicaMiddleware:
+    """
+    Lets the views of `REPLICA_VIEWS` read the replica database on GET and
+    HEAD requests, with read-your-writes stickiness.
+
+    After a request that may write (POST and other unsafe methods), the
+    client gets a cookie pinning it to the primary database for
+    `REPLICA_STICKINESS` seconds, long enough for the replica to catch up,
+    so it always sees what it has just posted.
+
+    It runs in the mode of the handler, so that under ASGI the async views
+    are awaited on the event loop instead of being called from a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = use_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replica.reset(token)
+        return self.pin_primary(request, response)
+
+    async def __acall__(self, request):
+        token = use_replica.set(False)
+        try:
+            response = await self.get_response(request)
+        finally:
+            use_replica.reset(token)
+        return self.pin_primary(request, response)
+
+    @staticmethod
+    def pin_primary(request, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            response.set_cookie(PIN_COOKIE, '1',
+                                max_age=settings.REPLICA_STICKINESS,
+                                httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        use_replica.set(
+            replica_alias() is not None
+            and request.method in ('GET', 'HEAD')
+            and request.resolver_match.url_name in settings.REPLICA_VIEWS
+            and PIN_COOKIE not in request.COOKIES
+        )
+
+    async def aprocess_view(self, request, view_func, view_args,
+                            view_kwargs):
+        # awaited in the task of the request, which then reads the variable
+        ReplicaMiddleware.process_view(self, request, view_func, view_args,
+                                       view_kwargs)
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.8 on 2026-10-16 20:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='review',
+            name='body',
+            field=models.TextField(blank=True, max_length=8192),
+        ),
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('review', 'Review'), ('ticket', 'Ticket')], max_length=6)),
+                ('item_id', models.PositiveBigIntegerField()),
+                ('time_created', models.DateTimeField()),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', '-time_created', '-kind', '-item_id'], name='timeline_owner_time_idx'), models.Index(fields=['kind', 'item_id'], name='timeline_item_idx')],
+                'constraints': [models.UniqueConstraint(fields=('owner', 'kind', 'item_id'), name='unique_timeline_item')],
+            },
+        ),
+    ]
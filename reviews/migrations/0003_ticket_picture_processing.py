@@ -0,0 +1,18 @@
+# Generated by Django 5.1.8 on 2026-10-16 20:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='picture_processing',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.8 on 2026-10-16 20:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_ticket_picture_processing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='picture_derivatives',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.8 on 2026-10-16 20:53
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def count_reviews(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    Ticket = apps.get_model('reviews', 'Ticket')
+
+    counters = (Review.objects.order_by().values('ticket')
+                .annotate(count=Count('id'), total=Sum('rating'),
+                          first=Min('time_created')))
+    for row in counters.iterator():
+        Ticket.objects.filter(id=row['ticket']).update(
+            review_count=row['count'],
+            rating_total=row['total'],
+            first_review_at=row['first'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='first_review_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='rating_total',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_reviews, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.8 on 2026-10-16 21:02
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def copy_time_created(apps, schema_editor):
+    for model in ('Ticket', 'Review'):
+        apps.get_model('reviews', model).objects.update(
+            time_updated=F('time_created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_ticket_review_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='time_updated',
+            field=models.DateTimeField(auto_now=True,
+                                       default=timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='time_updated',
+            field=models.DateTimeField(auto_now=True,
+                                       default=timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_time_created, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.8 on 2026-10-16 21:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_time_updated'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userfollows',
+            index=models.Index(condition=models.Q(('banned', False)), fields=['followed_user', 'user'], name='follows_followers_idx'),
+        ),
+    ]
@@ -1,9 +1,8 @@
-import os
-import textwrap
 from django.conf import settings
-from django.db import models
+from django.core.files.storage import default_storage
+from django.db import models, transaction
 
-from PIL import Image, ImageDraw, ImageFont
+from .images import cover_digest, delete_picture, schedule_ticket_picture
 
 
 class Ticket(models.Model):
@@ -11,26 +10,42 @@ class Ticket(models.Model):
        Model representing a support or review ticket.
 
        This model stores user-generated tickets with an optional image.
-       If no image is provided, a default one is generated with the
-       ticket's title. Uploaded images are converted to WebP format and
-       resized for optimization.
+       If no image is provided, a default cover with the ticket's title is
+       drawn on demand by the `ticket_cover` view. Uploaded images are
+       converted by background workers, after the request, to WebP versions
+       of several widths served as a responsive `srcset`.
 
        Attributes:
            title (CharField): The title of the ticket.
            description (TextField): A detailed description of the ticket.
            user (ForeignKey): The user who created the ticket.
            picture (ImageField): An optional image associated with the ticket.
+           picture_processing (BooleanField): The uploaded image is waiting
+               for its conversion.
+           picture_derivatives (JSONField): The manifest of the resized
+               versions of the uploaded image.
+           review_count (PositiveIntegerField): The number of reviews of the
+               ticket.
+           rating_total (PositiveIntegerField): The sum of their ratings.
+           first_review_at (DateTimeField): The date of the first review,
+               None while the ticket is not answered.
            time_created (DateTimeField): The creation timestamp of the ticket
-           IMAGE_SIZE (tuple): The dimensions for ticket images (141x180).
+           time_updated (DateTimeField): The last change of the ticket, the
+               version of its cached card.
+           IMAGE_SIZE (tuple): The dimensions of the default covers (141x180).
+
+       Meta:
+           indexes (list): The tickets of a user, newest first.
 
        Methods:
            save(*args, **kwargs):
-               Overrides the default save method to handle image conversion and
-                generation.
-           _process_uploaded_image():
-               Converts images to WebP format and resizes them if needed.
-           _generate_default_image():
-               Creates a default WebP image with the ticket title.
+               Overrides the default save method to schedule image conversion.
+           picture_srcset:
+               Returns the `srcset` of the picture's derivatives.
+           average_rating:
+               Returns the average rating of the reviews.
+           cover_digest:
+               Returns the key of the default cover drawn with the title.
            __str__():
                Returns the ticket title as its string representation.
        """
@@ -41,74 +56,98 @@ class Ticket(models.Model):
                              on_delete=models.CASCADE
                              )
     picture = models.ImageField(null=True, blank=True, upload_to='')
+    picture_processing = models.BooleanField(default=False)
+    picture_derivatives = models.JSONField(default=dict, blank=True)
+    # kept up to date by the signals of the reviews, see `counters.py`
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_total = models.PositiveIntegerField(default=0, editable=False)
+    first_review_at = models.DateTimeField(null=True, blank=True,
+                                           editable=False)
     time_created = models.DateTimeField(auto_now_add=True)
+    time_updated = models.DateTimeField(auto_now=True)
 
     IMAGE_SIZE = (141, 180)
 
+    # written by the database only, see `counters.py`
+    COUNTER_FIELDS = {'review_count', 'rating_total', 'first_review_at'}
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-time_created'],
+                         name='ticket_user_time_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the picture as stored, to delete its files once replaced
+        if {'picture', 'picture_derivatives'} <= set(field_names):
+            instance._stored_picture = (instance.picture.name,
+                                        instance.picture_derivatives)
+        return instance
+
     def save(self, *args, **kwargs):
         """
-        Sauvegarde l'objet et gère les images (conversion et génération).
-        """
+        Sauvegarde l'objet et gère la conversion des images.
 
-        super().save(*args, **kwargs)
+        A newly uploaded picture is stored as is and converted later by the
+        image processing workers, `picture_processing` is set meanwhile.
+        The files of a removed or replaced picture are deleted once the
+        ticket is committed.
 
-        if self.picture:
-            with Image.open(self.picture.path) as img:
-                # Vérifier si l'image est déjà en WebP et à la bonne taille
-                is_webp = self.picture.name.lower().endswith(".webp")
-                correct_size = img.size == self.IMAGE_SIZE
+        The review counters are left out of the update of an existing
+        ticket, the values loaded with it being possibly outdated.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = {
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key} - self.COUNTER_FIELDS
+        new_upload = bool(self.picture) and not self.picture._committed
+        stored_name, stored_manifest = getattr(self, '_stored_picture',
+                                               (None, {}))
+        replaced = bool(stored_name) and self.picture.name != stored_name
+        if new_upload or replaced:
+            self.picture_processing = new_upload
+            self.picture_derivatives = {}
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'],
+                                           'picture_processing',
+                                           'picture_derivatives'}
 
-                if not (is_webp and correct_size):
-                    self._process_uploaded_image()
+        super().save(*args, **kwargs)
+        self._stored_picture = (self.picture.name, self.picture_derivatives)
 
-        elif not self.picture:
-            self._generate_default_image()
+        if new_upload:
+            schedule_ticket_picture(self.id)
+        if replaced:
+            transaction.on_commit(
+                lambda: delete_picture(stored_name, stored_manifest))
 
-    def _process_uploaded_image(self):
+    @property
+    def picture_srcset(self) -> str:
         """
-        Converts to WebP and resizes the image only if necessary.
+        The `srcset` attribute listing the derivatives of the picture.
         """
-        img_path = self.picture.path
-        webp_path = os.path.splitext(img_path)[0] + ".webp"
-
-        with Image.open(img_path) as img:
-            img = img.convert("RGBA").resize(self.IMAGE_SIZE)
-            img.save(webp_path, "WEBP", lossless=True)
+        return ', '.join(
+            f"{default_storage.url(source['name'])} {source['width']}w"
+            for source in self.picture_derivatives.get('sources', []))
 
-        self.picture.name = f'{os.path.basename(webp_path)}'
-        self.save(update_fields=["picture"])
+    @property
+    def average_rating(self):
+        """
+        The average rating of the reviews, None if there is none.
+        """
+        if not self.review_count:
+            return None
+        return self.rating_total / self.review_count
 
-    def _generate_default_image(self):
+    @property
+    def cover_digest(self) -> str:
         """
-        Creates a default WebP image with the ticket title.
+        Key of the default cover drawn with the ticket's title, shared by the
+        tickets having the same title.
         """
-        if not self.id:
-            return  # évite les erreurs avant la première sauvegarde
-
-        webp_path = os.path.join(settings.MEDIA_ROOT,
-                                 f'default_{self.id}.webp')
-
-        image = Image.new("RGBA",
-                          self.IMAGE_SIZE,
-                          (204, 204, 204, 255)
-                          )
-        draw = ImageDraw.Draw(image)
-        font = ImageFont.load_default()
-
-        lines = textwrap.wrap(self.title, width=15)
-        y = (self.IMAGE_SIZE[1] - len(
-            lines) * 12) // 2  # Centrage vertical
-
-        for line in lines:
-            x = (self.IMAGE_SIZE[0] - len(
-                line) * 6) // 2  # Approximation centrage horizontal
-            draw.text((x, y), line, font=font, fill="black")
-            y += 12
-
-        image.save(webp_path, "WEBP", lossless=True)
-        self.picture.name = f'default_{self.id}.webp'
-        self.save(
-            update_fields=["picture"])
+        return cover_digest(self.title)
 
     def __str__(self):
         return self.title
@@ -129,8 +168,17 @@ class Review(models.Model):
        body (CharField): The detailed content of the review.
        user (ForeignKey): The user who created the review.
        time_created (DateTimeField): The review creation timestamp.
+       time_updated (DateTimeField): The last change of the review, the
+                                     version of its cached card.
+
+   Meta:
+       indexes (list): The reviews of a user, newest first, and the reviews
+                       of a ticket by user.
 
    Methods:
+       save(*args, **kwargs):
+           Saves the review and updates the counters of its ticket in the
+           same transaction.
        __str__():
            Returns the headline of the review as its string representation.
    """
@@ -144,6 +192,21 @@ class Review(models.Model):
     user = models.ForeignKey(
         to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     time_created = models.DateTimeField(auto_now_add=True)
+    time_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-time_created'],
+                         name='review_user_time_idx'),
+            models.Index(fields=['ticket', 'user'],
+                         name='review_ticket_user_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # the counters of the ticket are updated by a post_save receiver,
+        # they must be written or rolled back with the review
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f'{self.headline}'
@@ -166,6 +229,9 @@ class UserFollows(models.Model):
     Meta:
         unique_together (tuple): Ensures that a user cannot follow the same
         user multiple times.
+        indexes (list): The bans received by a user and his followers by
+                        id, the bans given and the followings are found
+                        with the unique index.
 
     """
     user = models.ForeignKey(to=settings.AUTH_USER_MODEL,
@@ -180,3 +246,56 @@ class UserFollows(models.Model):
         # ensures we don't get multiple UserFollows instances
         # for unique user-user_followed pairs
         unique_together = ('user', 'followed_user')
+        indexes = [
+            models.Index(fields=['followed_user', 'user'],
+                         condition=models.Q(banned=True),
+                         name='follows_banned_idx'),
+            models.Index(fields=['followed_user', 'user'],
+                         condition=models.Q(banned=False),
+                         name='follows_followers_idx'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """
+    Model representing an item of a precomputed home timeline.
+
+    When the materialized timeline is enabled (`MATERIALIZED_TIMELINE`
+    setting), every review and ticket is copied on creation into the
+    timeline of each user allowed to see it in his feed (fan-out on write),
+    so the feed is read with a single indexed range scan on the owner.
+
+    Attributes:
+        owner (ForeignKey): The user whose feed contains the item.
+        kind (CharField): The type of the item, 'review' or 'ticket'.
+        item_id (PositiveBigIntegerField): The id of the review or ticket.
+        time_created (DateTimeField): The creation timestamp of the item.
+
+    Meta:
+        constraints (list): Ensures that an item appears once per timeline.
+        indexes (list): The feed range scan, and the lookup of an item
+                        when it is deleted.
+    """
+    REVIEW = 'review'
+    TICKET = 'ticket'
+
+    owner = models.ForeignKey(to=settings.AUTH_USER_MODEL,
+                              on_delete=models.CASCADE,
+                              related_name='timeline')
+    kind = models.CharField(max_length=6,
+                            choices=[(REVIEW, 'Review'), (TICKET, 'Ticket')])
+    item_id = models.PositiveBigIntegerField()
+    time_created = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'kind', 'item_id'],
+                                    name='unique_timeline_item'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', '-time_created', '-kind',
+                                 '-item_id'],
+                         name='timeline_owner_time_idx'),
+            models.Index(fields=['kind', 'item_id'],
+                         name='timeline_item_idx'),
+        ]
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.urls import reverse
+
+from . import fanout
+from .feed import flux_timeline
+from .models import Review, Ticket
+
+
+class Broker:
+    """
+    In-process publish/subscribe of the "new posts" events.
+
+    Each open event stream subscribes an `asyncio.Event` for its user, set
+    when a post reaching the user's feed is committed in this process. The
+    posts are saved by sync code, in other threads than the event loops of
+    the streams, so the events are set through their loop.
+
+    Posts saved by other processes are not published here: the streams
+    also poll the database, see `NOTIFICATIONS_POLL_INTERVAL`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, user_id: int) -> asyncio.Event:
+        event = asyncio.Event()
+        with self._lock:
+            self._subscribers[user_id].add((asyncio.get_running_loop(),
+                                            event))
+        return event
+
+    def unsubscribe(self, user_id: int, event: asyncio.Event) -> None:
+        # called from the loop which subscribed the event
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            subscribers.discard((asyncio.get_running_loop(), event))
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def publish(self, user_ids) -> None:
+        """
+        Wakes up the streams of the given users.
+        """
+        with self._lock:
+            subscribers = [subscriber for user_id in user_ids
+                           for subscriber in self._subscribers.get(user_id,
+                                                                   ())]
+        for loop, event in subscribers:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # the loop of a stream being closed
+                pass
+
+
+broker = Broker()
+
+
+def publish_post(post) -> None:
+    """
+    Notifies the streams of the users whose feed shows a new ticket or
+    review. The audience is only computed when someone is listening.
+    """
+    if not broker.has_subscribers():
+        return
+
+    if isinstance(post, Ticket):
+        broker.publish(fanout.ticket_audience(post))
+    elif isinstance(post, Review):
+        broker.publish(fanout.review_audience(post))
+
+
+def streams_events(request) -> bool:
+    """
+    Whether the request is served by the ASGI handler, which sends the
+    events of a stream as they come. The WSGI handler reads a whole stream
+    before sending it, holding a worker for `NOTIFICATIONS_STREAM_DURATION`.
+    """
+    return isinstance(request, ASGIRequest)
+
+
+def format_event(name: str, data: dict) -> str:
+    return f'event: {name}\ndata: {json.dumps(data)}\n\n'
+
+
+async def new_posts_stream(user, cursor: str = None):
+    """
+    Yields the server-sent events telling a user how many items of his feed
+    are newer than the page he is reading.
+
+    The items are counted when the stream opens, then each time a post
+    reaching his feed is published in this process, and at least every
+    `NOTIFICATIONS_POLL_INTERVAL` seconds for the posts saved by the other
+    workers. A "new-posts" event is sent when the count changes, a comment
+    keeps the connection alive otherwise. The stream ends after
+    `NOTIFICATIONS_STREAM_DURATION` seconds, the browser reconnects with
+    the same cursor.
+
+    Args:
+        user (User): The owner of the feed.
+        cursor (str): The `head_cursor` of the page read by the user.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.NOTIFICATIONS_STREAM_DURATION
+    timeline = await sync_to_async(flux_timeline)(user)
+    # the first page holds the newest items
+    url = reverse('flux')
+
+    event = broker.subscribe(user.id)
+    try:
+        yield f'retry: {settings.NOTIFICATIONS_RETRY * 1000}\n\n'
+
+        sent = 0
+        while loop.time() < deadline:
+            count = await sync_to_async(timeline.count_newer)(cursor)
+            if count != sent:
+                yield format_event('new-posts', {'count': count, 'url': url})
+                sent = count
+            else:
+                yield ': keep-alive\n\n'
+
+            timeout = min(settings.NOTIFICATIONS_POLL_INTERVAL,
+                          max(deadline - loop.time(), 0))
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            event.clear()
+    finally:
+        broker.unsubscribe(user.id, event)
@@ -0,0 +1,397 @@
+from typing import NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, Exists, OuterRef, Q, QuerySet
+from django.db.models.functions import Lower
+
+from authentification.models import User
+
+from .models import UserFollows
+
+
+def get_banning_users(user: User) -> QuerySet:
+    """
+    Retrieves users who have banned the given user.
+
+    Args:
+        user (User): The user for whom we want to find blockers.
+
+    Returns:
+        QuerySet: A list of users who have banned the given user.
+    """
+    return User.objects.filter(
+        following__followed_user=user,
+        following__banned=True
+    )
+
+
+def get_banned_users(user: User) -> QuerySet:
+    """
+    Retrieves the users that the given user has banned.
+
+    Args:
+        user (User): The user who has banned other users.
+
+    Returns:
+        QuerySet: A list of users who have been banned by the given user.
+    """
+    return User.objects.filter(
+        followers__user=user,
+        followers__banned=True
+    )
+
+
+def get_followers(user: User) -> QuerySet:
+    """
+    Retrieves the users who follow the given user, excluding those who have
+    banned him.
+
+    Args:
+        user (User): The user whose followers we want to retrieve.
+
+    Returns:
+        QuerySet: A list of users following the given user, excluding those who
+         have banned him.
+    """
+    banning_users = get_banning_users(user)
+    return User.objects.filter(
+        following__followed_user=user
+    ).exclude(id__in=banning_users)
+
+
+def get_followings(user: User) -> QuerySet:
+    """
+    those that the user follows less those who have banned him and those that
+    the user has banned
+    """
+    banning_users = get_banning_users(user)
+    banned_users = get_banned_users(user)
+    return User.objects.filter(
+        followers__user=user).exclude(
+        id__in=banning_users).exclude(
+        id__in=banned_users)
+
+
+def followable_users(user: User) -> QuerySet:
+    """
+    Retrieves the users that the given user can follow: everybody but
+    himself, the admin, the users he already follows and those who have
+    banned him. The exclusions are subqueries, nothing is loaded.
+
+    Args:
+        user (User): The user looking for people to follow.
+
+    Returns:
+        QuerySet: The users he can follow.
+    """
+    return (User.objects.exclude(id=user.id)
+            .exclude(username='admin')
+            .exclude(Exists(UserFollows.objects.filter(
+                user=user, followed_user=OuterRef('pk'))))
+            .exclude(Exists(UserFollows.objects.filter(
+                user=OuterRef('pk'), followed_user=user, banned=True))))
+
+
+def search_users(user: User, prefix: str, limit: int = 10) -> QuerySet:
+    """
+    Retrieves the first users that the given user can follow whose username
+    starts with a prefix, ignoring the case.
+
+    The prefix is searched as a range on the lowercased usernames, which
+    walks the `user_username_lower_idx` index.
+
+    Args:
+        user (User): The user looking for people to follow.
+        prefix (str): The beginning of the username.
+        limit (int): The maximum number of users returned.
+
+    Returns:
+        QuerySet: The matching users, by username.
+    """
+    prefix = prefix.strip().lower()
+    if not prefix:
+        return User.objects.none()
+
+    return (followable_users(user)
+            .alias(username_lower=Lower('username'))
+            .filter(username_lower__gte=prefix,
+                    username_lower__lt=prefix + '\U0010ffff')
+            .order_by('username_lower')[:limit])
+
+
+def followers_list(user: User) -> QuerySet:
+    """
+    Retrieves the users who follow the given user, less those who have
+    banned him, by id. Each one is annotated with `banned_by_user`, telling
+    whether the given user has banned him.
+
+    Args:
+        user (User): The followed user.
+
+    Returns:
+        QuerySet: His followers, to be read a page at a time.
+    """
+    return (User.objects.filter(following__followed_user=user,
+                                following__banned=False)
+            .annotate(banned_by_user=Exists(UserFollows.objects.filter(
+                user=user, followed_user=OuterRef('pk'), banned=True)))
+            .order_by('id'))
+
+
+def followings_list(user: User) -> QuerySet:
+    """
+    Retrieves the users followed by the given user, less those he has
+    banned, by id. Each one is annotated with `banning_user`, telling
+    whether he has banned the given user.
+
+    Args:
+        user (User): The following user.
+
+    Returns:
+        QuerySet: His followings, to be read a page at a time.
+    """
+    return (User.objects.filter(followers__user=user,
+                                followers__banned=False)
+            .annotate(banning_user=Exists(UserFollows.objects.filter(
+                user=OuterRef('pk'), followed_user=user, banned=True)))
+            .order_by('id'))
+
+
+class UsersPage(NamedTuple):
+    """
+    A page of a list of users read after the id of the last user of the
+    previous page.
+
+    Attributes:
+        users (list): The users of the page.
+        next_after (int): The id to read the following page after, or None
+                          on the last page.
+    """
+    users: list
+    next_after: int | None
+
+
+def users_page(users: QuerySet, after=None, size: int = 50) -> UsersPage:
+    """
+    Reads a page of `followers_list` or `followings_list` with keyset
+    pagination: only `size + 1` rows are read after the given id.
+
+    Args:
+        users (QuerySet): The users ordered by id.
+        after (str): The id received in the query string, if any.
+        size (int): The number of users of the page.
+
+    Returns:
+        UsersPage: The users and the position of the next page.
+    """
+    return users_page_of(list(page_slice(users, after, size)), size)
+
+
+async def ausers_page(users: QuerySet, after=None,
+                      size: int = 50) -> UsersPage:
+    """
+    Async version of `users_page`.
+    """
+    return users_page_of([user async for user
+                          in page_slice(users, after, size)], size)
+
+
+def page_slice(users: QuerySet, after, size: int) -> QuerySet:
+    try:
+        users = users.filter(id__gt=int(after))
+    except (TypeError, ValueError):
+        pass
+    return users[:size + 1]
+
+
+def users_page_of(rows: list, size: int) -> UsersPage:
+    if len(rows) > size:
+        return UsersPage(rows[:size], rows[size - 1].id)
+    return UsersPage(rows, None)
+
+
+class FollowCounts(NamedTuple):
+    """
+    The lengths of the lists of the follow page.
+
+    Attributes:
+        following (int): The length of `followings_list`.
+        followers (int): The length of `followers_list`.
+    """
+    following: int
+    followers: int
+
+
+class Relations(NamedTuple):
+    """
+    Snapshot of the relationships of a user, as frozen sets of user ids.
+
+    It holds the same users as the querysets above, so views and templates
+    can test membership in memory instead of querying.
+
+    Attributes:
+        following (frozenset): The users he follows, less those who have
+                               banned him and those he has banned.
+        followers (frozenset): The users who follow him, less those who
+                               have banned him.
+        banned (frozenset): The users he has banned.
+        banning (frozenset): The users who have banned him.
+    """
+    following: frozenset
+    followers: frozenset
+    banned: frozenset
+    banning: frozenset
+
+
+def relations_cache():
+    return caches[getattr(settings, 'RELATIONS_CACHE', 'default')]
+
+
+def relations_cache_key(user_id: int) -> str:
+    return f'relations:{user_id}'
+
+
+def relations_rows(user_id: int) -> QuerySet:
+    # read from the primary database, a lagging replica would cache the
+    # relationships from before a ban until the entry expires
+    return UserFollows.objects.using(DEFAULT_DB_ALIAS).filter(
+        Q(user_id=user_id) | Q(followed_user_id=user_id)
+    ).values_list('user_id', 'followed_user_id', 'banned')
+
+
+def build_relations(user_id: int, rows=None) -> Relations:
+    """
+    Reads the relationships of a user with a single query.
+
+    Args:
+        user_id (int): The id of the user.
+        rows (list): The rows of `relations_rows`, when they are already
+                     read.
+
+    Returns:
+        Relations: The snapshot of his relationships.
+    """
+    follows, followed_by = set(), set()
+    banned, banning = set(), set()
+
+    if rows is None:
+        rows = relations_rows(user_id)
+
+    for follower_id, followed_id, is_banned in rows:
+        if follower_id == user_id:
+            follows.add(followed_id)
+            if is_banned:
+                banned.add(followed_id)
+        if followed_id == user_id:
+            followed_by.add(follower_id)
+            if is_banned:
+                banning.add(follower_id)
+
+    return Relations(
+        following=frozenset(follows - banned - banning),
+        followers=frozenset(followed_by - banning),
+        banned=frozenset(banned),
+        banning=frozenset(banning),
+    )
+
+
+def get_relations(user_id: int) -> Relations:
+    """
+    Returns the relationships of a user from the cache, building them on a
+    miss. Entries are invalidated when a `UserFollows` is saved or deleted.
+
+    Args:
+        user_id (int): The id of the user.
+
+    Returns:
+        Relations: The snapshot of his relationships.
+    """
+    cache = relations_cache()
+    key = relations_cache_key(user_id)
+
+    relations = cache.get(key)
+    if relations is None:
+        relations = build_relations(user_id)
+        cache.set(key, relations,
+                  getattr(settings, 'RELATIONS_CACHE_TIMEOUT', 3600))
+    return relations
+
+
+async def aget_relations(user_id: int) -> Relations:
+    """
+    Async version of `get_relations`.
+    """
+    cache = relations_cache()
+    key = relations_cache_key(user_id)
+
+    relations = await cache.aget(key)
+    if relations is None:
+        rows = [row async for row in relations_rows(user_id)]
+        relations = build_relations(user_id, rows)
+        await cache.aset(key, relations,
+                         getattr(settings, 'RELATIONS_CACHE_TIMEOUT', 3600))
+    return relations
+
+
+def follow_counts_key(user_id: int) -> str:
+    return f'follow_counts:{user_id}'
+
+
+def count_follows(user_id: int) -> FollowCounts:
+    """
+    Counts the followings and the followers of a user with a single
+    aggregate query, on the primary database as they are cached.
+    """
+    follows = UserFollows.objects.using(DEFAULT_DB_ALIAS)
+    return FollowCounts(**follows.filter(
+        Q(user_id=user_id) | Q(followed_user_id=user_id), banned=False
+    ).aggregate(following=Count('id', filter=Q(user_id=user_id)),
+                followers=Count('id', filter=Q(followed_user_id=user_id))))
+
+
+def get_follow_counts(user_id: int) -> FollowCounts:
+    """
+    Returns the number of followings and followers of a user from the
+    cache, counting them on a miss. Entries are dropped with the
+    relationships, by `invalidate_relations`.
+
+    Args:
+        user_id (int): The id of the user.
+
+    Returns:
+        FollowCounts: His counters.
+    """
+    cache = relations_cache()
+    key = follow_counts_key(user_id)
+
+    counts = cache.get(key)
+    if counts is None:
+        counts = count_follows(user_id)
+        cache.set(key, counts,
+                  getattr(settings, 'RELATIONS_CACHE_TIMEOUT', 3600))
+    return counts
+
+
+async def aget_follow_counts(user_id: int) -> FollowCounts:
+    """
+    Async version of `get_follow_counts`.
+    """
+    cache = relations_cache()
+    key = follow_counts_key(user_id)
+
+    counts = await cache.aget(key)
+    if counts is None:
+        counts = await sync_to_async(count_follows)(user_id)
+        await cache.aset(key, counts,
+                         getattr(settings, 'RELATIONS_CACHE_TIMEOUT', 3600))
+    return counts
+
+
+def invalidate_relations(*user_ids: int) -> None:
+    relations_cache().delete_many(
+        [key for user_id in user_ids
+         for key in (relations_cache_key(user_id),
+                     follow_counts_key(user_id))])
@@ -0,0 +1,45 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# set by `ReplicaMiddleware` while a view allowed to read the replica runs
+use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_alias():
+    """
+    Returns the alias of the replica database, None if it isn't configured.
+    """
+    alias = getattr(settings, 'REPLICA_DATABASE', None)
+    return alias if alias in settings.DATABASES else None
+
+
+class ReplicaRouter:
+    """
+    Sends the reads of the feed views to the replica database, everything
+    else to the primary one.
+
+    The reads go to the replica only while `use_replica` is set, which
+    `ReplicaMiddleware` does for the GET requests of the `REPLICA_VIEWS`
+    made by a client that has not written recently. Writes, and the reads
+    of the other views and of the management commands, always use the
+    primary database.
+    """
+
+    def db_for_read(self, model, **hints):
+        if use_replica.get():
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # both databases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica receives the schema from the primary
+        if db == replica_alias():
+            return False
+        return None
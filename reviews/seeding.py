@@ -0,0 +1,189 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from authentification.models import User
+
+from .counters import repair_ticket_counters
+from .models import Review, Ticket, UserFollows
+from .relations import relations_cache
+
+# number of rows inserted per query
+BATCH_SIZE = 1000
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Lets `bulk_create` keep the creation and modification dates given to
+    the instances instead of replacing them by the current time.
+    """
+    fields = [(field, field.auto_now, field.auto_now_add)
+              for model in models for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False)
+              or getattr(field, 'auto_now_add', False)]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def never_updated(posts):
+    """
+    Dates the modification of the generated posts at their creation.
+    """
+    for post in posts:
+        post.time_updated = post.time_created
+        yield post
+
+
+def power_law_weights(count: int, exponent: float, rng) -> list:
+    """
+    Returns the cumulated weights of `count` items drawn with a power law:
+    the item of rank `r` is drawn in proportion to `1 / r ** exponent`, the
+    ranks being given at random. An exponent of 0 draws them uniformly.
+    """
+    ranks = list(range(1, count + 1))
+    rng.shuffle(ranks)
+    return list(accumulate(1 / rank ** exponent for rank in ranks))
+
+
+@transaction.atomic
+def seed_social_graph(users=1000, follows_per_user=20, ban_ratio=0.05,
+                      tickets_per_user=3, reviews_per_user=3,
+                      password='Invit1234', prefix='member', days=365,
+                      seed=0, follower_exponent=0.0, poster_exponent=0.0,
+                      image_ratio=1.0) -> dict:
+    """
+    Fills the database with a random social graph of users, follows, bans,
+    tickets and reviews, spread over the last `days` days.
+
+    With a positive `follower_exponent`, a few users gather most of the
+    followers, as on a real network; with a positive `poster_exponent`, a
+    few users write most of the posts.
+
+    Rows are written with `bulk_create`, so no signal is sent: tickets get
+    no image processing and the materialized timelines must be rebuilt with
+    the `rebuild_timelines` command. The review counters of the tickets are
+    repaired and the relationships cache is cleared.
+
+    Args:
+        users (int): The number of users to create.
+        follows_per_user (int): The average number of users followed.
+        ban_ratio (float): The share of follows turned into bans.
+        tickets_per_user (int): The average number of tickets per user.
+        reviews_per_user (int): The average number of reviews per user.
+        password (str): The password of every created user.
+        prefix (str): The prefix of the usernames, followed by a number.
+        days (int): The period over which posts are spread.
+        seed (int): The seed of the random generator.
+        follower_exponent (float): The exponent of the power law of the
+            number of followers, 0 for a uniform graph.
+        poster_exponent (float): The exponent of the power law of the
+            number of posts, 0 for the same average for everyone.
+        image_ratio (float): The share of tickets with a picture.
+
+    Returns:
+        dict: The number of created rows per model.
+    """
+    rng = random.Random(seed)
+    end = timezone.now()
+    start = end - timedelta(days=days)
+
+    def random_time():
+        return start + timedelta(seconds=rng.uniform(0, days * 86400))
+
+    # hashing is slow, every user shares the same hash
+    hashed_password = make_password(password)
+    first_id = (User.objects.order_by('-id')
+                .values_list('id', flat=True).first() or 0) + 1
+    members = User.objects.bulk_create(
+        [User(username=f'{prefix}{first_id + n}',
+              email=f'{prefix}{first_id + n}@example.com',
+              password=hashed_password)
+         for n in range(users)],
+        batch_size=BATCH_SIZE
+    )
+    member_ids = [member.id for member in members]
+
+    popularity = power_law_weights(len(member_ids), follower_exponent, rng)
+    activity = power_law_weights(len(member_ids), poster_exponent, rng)
+
+    def random_author():
+        return rng.choices(member_ids, cum_weights=activity)[0]
+
+    follows = {}
+    for user_id in member_ids:
+        count = min(len(member_ids) - 1,
+                    rng.randint(0, 2 * follows_per_user))
+        if follower_exponent:
+            followed = set()
+            # the most followed users are drawn again and again, the
+            # number of draws is bounded for the very skewed graphs
+            for _ in range(10):
+                followed.update(rng.choices(member_ids,
+                                            cum_weights=popularity,
+                                            k=count - len(followed)))
+                followed.discard(user_id)
+                if len(followed) >= count:
+                    break
+        else:
+            followed = set(rng.sample(member_ids, count + 1)) - {user_id}
+        for followed_id in followed:
+            follows[user_id, followed_id] = rng.random() < ban_ratio
+    UserFollows.objects.bulk_create(
+        [UserFollows(user_id=user_id,
+                     followed_user_id=followed_id,
+                     banned=banned)
+         for (user_id, followed_id), banned in follows.items()],
+        batch_size=BATCH_SIZE
+    )
+
+    with explicit_timestamps(Ticket, Review):
+        tickets = Ticket.objects.bulk_create(never_updated(
+            Ticket(title=f'Livre {n}',
+                   description='Description du livre.',
+                   user_id=random_author(),
+                   picture=('default_1.webp' if rng.random() < image_ratio
+                            else ''),
+                   time_created=random_time())
+            for n in range(users * tickets_per_user)),
+            batch_size=BATCH_SIZE
+        )
+
+        reviews = Review.objects.bulk_create(never_updated(
+            Review(ticket=ticket,
+                   user_id=random_author(),
+                   rating=rng.randint(1, 5),
+                   headline=f'Critique {n}',
+                   body='Mon avis sur ce livre.',
+                   time_created=min(end, ticket.time_created + timedelta(
+                       seconds=rng.uniform(0, 86400))))
+            for n, ticket in enumerate(
+                rng.choices(tickets, k=users * reviews_per_user))),
+            batch_size=BATCH_SIZE
+        )
+
+    if tickets:
+        # the seeded tickets are the last ones, a list of their ids would
+        # pass the limit of the variables of a query
+        repair_ticket_counters(Ticket.objects.filter(
+            id__gte=tickets[0].id))
+    relations_cache().clear()
+
+    return {
+        'users': len(members),
+        'follows': len(follows),
+        'bans': sum(follows.values()),
+        'tickets': len(tickets),
+        'pictures': sum(bool(ticket.picture) for ticket in tickets),
+        'reviews': len(reviews),
+    }
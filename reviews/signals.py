@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from authentification.models import User
+
+from . import counters, fanout, notifications
+from .follows import batch_in_progress
+from .fragments import REVIEW_FRAGMENT, TICKET_FRAGMENT, invalidate_fragment
+from .models import Review, Ticket, TimelineEntry, UserFollows
+from .relations import invalidate_relations
+
+
+def materialized_timeline_enabled() -> bool:
+    return getattr(settings, 'MATERIALIZED_TIMELINE', False)
+
+
+@receiver(post_save, sender=UserFollows)
+@receiver(post_delete, sender=UserFollows)
+def invalidate_relations_cache(sender, instance, **kwargs):
+    """
+    Drops the cached relationships of both users of a follow, unfollow or
+    ban. It is done again on commit, in case a concurrent request cached the
+    relationships before the transaction was committed. This receiver is
+    connected before the timeline rebuild, which reads the relationships.
+    Batches of relationships are invalidated once, by `follows.py`.
+    """
+    if batch_in_progress.get():
+        return
+
+    user_ids = (instance.user_id, instance.followed_user_id)
+
+    invalidate_relations(*user_ids)
+    transaction.on_commit(lambda: invalidate_relations(*user_ids))
+
+
+@receiver(post_save, sender=Ticket)
+def fan_out_ticket(sender, instance, created, raw=False, **kwargs):
+    """
+    Copies a new ticket into the timelines. Fixtures (raw saves) are left
+    to the `rebuild_timelines` command.
+    """
+    if created and not raw and materialized_timeline_enabled():
+        fanout.fan_out_ticket(instance)
+
+
+@receiver(post_save, sender=Review)
+def fan_out_review(sender, instance, created, raw=False, **kwargs):
+    """
+    Copies a new review into the timelines.
+    """
+    if created and not raw and materialized_timeline_enabled():
+        fanout.fan_out_review(instance)
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_save, sender=Review)
+def notify_new_post(sender, instance, created, raw=False, **kwargs):
+    """
+    Wakes up the "new posts" streams of the users concerned by a new ticket
+    or review, once it is committed.
+    """
+    if created and not raw:
+        transaction.on_commit(lambda: notifications.publish_post(instance))
+
+
+@receiver(post_save, sender=Review)
+def count_review(sender, instance, created, raw=False, **kwargs):
+    """
+    Updates the review counters of the ticket, in the transaction of the
+    review. Fixtures carry the counters of their tickets, those written
+    without them are fixed by the `repair_ticket_counters` command.
+    """
+    if raw:
+        return
+    if created:
+        counters.add_review(instance)
+    else:
+        counters.update_rating(instance)
+
+
+@receiver(post_delete, sender=Review)
+def uncount_review(sender, instance, **kwargs):
+    counters.remove_review(instance)
+
+
+@receiver(pre_save, sender=Ticket)
+@receiver(pre_save, sender=Review)
+def date_fixture_row(sender, instance, raw=False, **kwargs):
+    """
+    Dates the last change of a row of a fixture written before
+    `time_updated` existed with its creation: raw saves leave the `auto_now`
+    fields as they are loaded.
+    """
+    if raw and instance.time_updated is None:
+        instance.time_updated = instance.time_created
+
+
+@receiver(pre_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+def invalidate_ticket_card(sender, instance, raw=False, **kwargs):
+    """
+    Drops the cached card of a ticket being modified or deleted. Before the
+    save, the instance still holds the version of the displayed card; the
+    new version makes a new key anyway.
+    """
+    if instance.pk and not raw:
+        invalidate_fragment(TICKET_FRAGMENT, instance)
+
+
+@receiver(pre_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_review_card(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        invalidate_fragment(REVIEW_FRAGMENT, instance)
+
+
+@receiver(post_delete, sender=Ticket)
+def remove_ticket(sender, instance, **kwargs):
+    if materialized_timeline_enabled():
+        fanout.remove_from_timelines(TimelineEntry.TICKET, instance.id)
+
+
+@receiver(post_delete, sender=Review)
+def remove_review(sender, instance, **kwargs):
+    if materialized_timeline_enabled():
+        fanout.remove_from_timelines(TimelineEntry.REVIEW, instance.id)
+
+
+@receiver(post_save, sender=UserFollows)
+@receiver(post_delete, sender=UserFollows)
+def rebuild_relation_timelines(sender, instance, raw=False, **kwargs):
+    """
+    Rebuilds the timelines of both users of a follow, unfollow or ban.
+
+    Only their feeds depend on the relationship. The rebuild waits for the
+    commit, so that a relationship deleted along with one of the users
+    does not recreate entries for a user being deleted.
+    """
+    if raw or not materialized_timeline_enabled() or batch_in_progress.get():
+        return
+
+    user_ids = {instance.user_id, instance.followed_user_id}
+
+    def rebuild():
+        for user in User.objects.filter(id__in=user_ids):
+            fanout.rebuild_timeline(user)
+
+    transaction.on_commit(rebuild)
@@ -0,0 +1,131 @@
+import datetime
+import json
+from itertools import groupby, islice
+
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from authentification.models import User
+
+from .models import Review, Ticket, UserFollows
+from .relations import relations_cache
+from .seeding import explicit_timestamps
+
+# the exported models, by their name in the lines, in dependency order
+MODELS = {
+    'user': User,
+    'ticket': Ticket,
+    'review': Review,
+    'follow': UserFollows,
+}
+
+# number of rows read or inserted per query
+BATCH_SIZE = 2000
+
+
+class SnapshotEncoder(DjangoJSONEncoder):
+    """
+    Keeps the microseconds of the dates, which `DjangoJSONEncoder` cuts to
+    milliseconds: the cursors of the feed embed them.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def model_fields(model) -> list:
+    """
+    Returns the attribute names of the concrete fields of a model, the
+    foreign keys as their `_id` column.
+    """
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def export_snapshot(stream, batch_size: int = BATCH_SIZE) -> dict:
+    """
+    Writes the users, tickets, reviews and follows as JSON lines, such as
+    `{"model": "ticket", "fields": {...}}`.
+
+    The rows are read as dicts by chunks of `batch_size`, so the memory used
+    does not depend on the size of the database.
+
+    Args:
+        stream: A text file open for writing.
+        batch_size (int): The number of rows fetched at a time.
+
+    Returns:
+        dict: The number of exported rows per model.
+    """
+    counts = {}
+    for name, model in MODELS.items():
+        rows = (model.objects.order_by('pk')
+                .values(*model_fields(model))
+                .iterator(chunk_size=batch_size))
+        counts[name] = 0
+        for row in rows:
+            stream.write(json.dumps({'model': name, 'fields': row},
+                                    cls=SnapshotEncoder) + '\n')
+            counts[name] += 1
+    return counts
+
+
+def read_lines(stream):
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            yield MODELS[item['model']], item['fields']
+        except (ValueError, KeyError, TypeError):
+            raise ValueError(f"Invalid line {number} of the snapshot.")
+
+
+@transaction.atomic
+def import_snapshot(stream, batch_size: int = BATCH_SIZE,
+                    process_images: bool = True) -> dict:
+    """
+    Loads a snapshot written by `export_snapshot`, in one transaction.
+
+    The lines are read one batch at a time and inserted with `bulk_create`,
+    so the memory used does not depend on the size of the snapshot. No
+    signal is sent: the review counters of the tickets are taken from the
+    snapshot, and the materialized timelines must be rebuilt with the
+    `rebuild_timelines` command. The sequences of the primary keys are
+    reset after the rows inserted with their ids.
+
+    Args:
+        stream: A text file of JSON lines.
+        batch_size (int): The number of rows inserted per query.
+        process_images (bool): Flag the uploaded pictures without
+            derivatives as waiting for their processing, which the
+            `process_pending_images` command does. Otherwise they are
+            served as they are until `reprocess_covers` is run.
+
+    Returns:
+        dict: The number of imported rows per model.
+    """
+    counts = dict.fromkeys(MODELS, 0)
+    names = {model: name for name, model in MODELS.items()}
+
+    with explicit_timestamps(*MODELS.values()):
+        for model, items in groupby(read_lines(stream), key=lambda i: i[0]):
+            while batch := list(islice(items, batch_size)):
+                instances = [model(**fields) for _, fields in batch]
+                if model is Ticket and process_images:
+                    for ticket in instances:
+                        ticket.picture_processing = (
+                            bool(ticket.picture)
+                            and not ticket.picture_derivatives)
+                model.objects.bulk_create(instances)
+                counts[names[model]] += len(instances)
+
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(),
+                                                     list(MODELS.values())):
+            cursor.execute(sql)
+
+    relations_cache().clear()
+    return counts
@@ -0,0 +1,12 @@
+from django.urls import path
+
+from LITRevu.urls import urlpatterns
+from reviews import async_views
+
+# the project's URLs, the feed views being the async ones
+urlpatterns = [
+    path('', async_views.flux, name='flux'),
+    path('follow/', async_views.follow, name='follow'),
+    path('posts/', async_views.user_posts, name='user_posts'),
+    *urlpatterns,
+]
@@ -0,0 +1,24 @@
+from django.db import connections
+from django.test import TestCase
+
+
+class ReplicaTestCase(TestCase):
+    """
+    Test case of the views reading the replica database.
+
+    In the tests, the replica is a second connection to the in-memory
+    database of the primary one. It is allowed to read the rows written by
+    the transaction wrapping each test, as a replica without lag would.
+    """
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        replica = connections['replica']
+        replica.ensure_connection()
+        # the test transaction of the replica must not take the write lock
+        # held by the one of the primary
+        replica.transaction_mode = None
+        with replica.cursor() as cursor:
+            cursor.execute('PRAGMA read_uncommitted = 1')
+        super().setUpClass()
@@ -0,0 +1,60 @@
+import re
+
+from django.db.models import Count
+from django.test import override_settings
+from django.urls import reverse
+
+from authentification.models import User
+from reviews.relations import relations_cache
+from reviews.seeding import seed_social_graph
+from reviews.tests.replica import ReplicaTestCase
+
+CSRF_TOKEN = re.compile(r'name="csrfmiddlewaretoken" value="[^"]*"')
+
+
+class AsyncFeedViewsTests(ReplicaTestCase):
+    """
+    The async feed views render the same pages as the sync ones.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_social_graph(users=40, follows_per_user=6, ban_ratio=0.1,
+                          tickets_per_user=3, reviews_per_user=3)
+        cls.member = (User.objects.annotate(followings=Count('following'))
+                      .order_by('-followings').first())
+
+    def setUp(self):
+        relations_cache().clear()
+        self.client.force_login(self.member)
+
+    def pages(self, name, query=''):
+        sync = self.client.get(reverse(name) + query)
+        with override_settings(ROOT_URLCONF='reviews.tests.async_urls'):
+            relations_cache().clear()
+            asynchronous = self.client.get(reverse(name) + query)
+
+        self.assertEqual(sync.status_code, 200)
+        self.assertEqual(asynchronous.status_code, 200)
+        return [CSRF_TOKEN.sub('', response.content.decode())
+                for response in (sync, asynchronous)]
+
+    def test_flux(self):
+        sync, asynchronous = self.pages('flux')
+        self.assertEqual(asynchronous, sync)
+
+        cursor = re.search(r'\?cursor=([\w-]+)">suivante', sync).group(1)
+        sync, asynchronous = self.pages('flux', f'?cursor={cursor}')
+        self.assertEqual(asynchronous, sync)
+
+    def test_flux_offset_page(self):
+        sync, asynchronous = self.pages('flux', '?page=2')
+        self.assertEqual(asynchronous, sync)
+
+    def test_user_posts(self):
+        sync, asynchronous = self.pages('user_posts')
+        self.assertEqual(asynchronous, sync)
+
+    def test_follow(self):
+        sync, asynchronous = self.pages('follow')
+        self.assertEqual(asynchronous, sync)
@@ -0,0 +1,117 @@
+import io
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from authentification.models import User
+from reviews.counters import repair_ticket_counters
+from reviews.models import Review, Ticket
+
+
+class TicketCountersTests(TestCase):
+    """
+    The review counters of the tickets follow the creation, modification
+    and deletion of their reviews.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('auteur', 'a@example.com',
+                                              'Invit1234')
+        cls.readers = [
+            User.objects.create_user(f'lecteur{n}', f'l{n}@example.com',
+                                     'Invit1234')
+            for n in range(3)
+        ]
+
+    def setUp(self):
+        self.ticket = Ticket.objects.create(title='Dune', description='SF',
+                                            user=self.author)
+
+    def review(self, reader, rating):
+        return Review.objects.create(ticket=self.ticket, user=reader,
+                                     rating=rating, headline='Avis')
+
+    def assertCounters(self, count, average, first_review):
+        self.ticket.refresh_from_db()
+        self.assertEqual(self.ticket.review_count, count)
+        self.assertEqual(self.ticket.average_rating, average)
+        self.assertEqual(self.ticket.first_review_at,
+                         first_review and first_review.time_created)
+
+    def test_new_ticket_is_not_answered(self):
+        self.assertCounters(0, None, None)
+
+    def test_reviews_are_counted(self):
+        first = self.review(self.readers[0], 5)
+        self.review(self.readers[1], 2)
+
+        self.assertCounters(2, 3.5, first)
+
+    def test_modified_rating_is_counted(self):
+        review = self.review(self.readers[0], 5)
+        review.rating = 1
+        review.save()
+
+        self.assertCounters(1, 1, review)
+
+    def test_deleted_reviews_are_uncounted(self):
+        first = self.review(self.readers[0], 5)
+        second = self.review(self.readers[1], 3)
+
+        first.delete()
+        self.assertCounters(1, 3, second)
+
+        second.delete()
+        self.assertCounters(0, None, None)
+
+    def test_stale_ticket_keeps_the_counters(self):
+        stale = Ticket.objects.get(id=self.ticket.id)
+        review = self.review(self.readers[0], 4)
+
+        stale.title = 'Dune, tome 1'
+        stale.save()
+
+        self.assertCounters(1, 4, review)
+        self.assertEqual(self.ticket.title, 'Dune, tome 1')
+
+    def test_answered_ticket_is_not_modified(self):
+        self.review(self.readers[0], 4)
+        self.client.force_login(self.author)
+
+        response = self.client.post(
+            reverse('modify_ticket', args=[self.ticket.id]),
+            {'title': 'Autre', 'description': 'SF'})
+
+        self.assertRedirects(response, reverse('flux'),
+                             fetch_redirect_response=False)
+        self.ticket.refresh_from_db()
+        self.assertEqual(self.ticket.title, 'Dune')
+
+    def test_repair(self):
+        review = self.review(self.readers[0], 4)
+        Review.objects.bulk_create([
+            Review(ticket=self.ticket, user=self.readers[1], rating=2,
+                   headline='Avis'),
+        ])
+        untouched = Ticket.objects.create(title='Fondation',
+                                          description='SF', user=self.author)
+
+        self.assertEqual(repair_ticket_counters(), 1)
+        self.assertCounters(2, 3, review)
+        untouched.refresh_from_db()
+        self.assertEqual(untouched.review_count, 0)
+
+        # nothing left to repair
+        self.assertEqual(repair_ticket_counters(), 0)
+
+    def test_repair_command(self):
+        Ticket.objects.filter(id=self.ticket.id).update(review_count=7)
+
+        output = io.StringIO()
+        call_command('repair_ticket_counters', self.ticket.id, stdout=output)
+
+        self.assertIn('1 tickets repaired', output.getvalue())
+
+        self.assertCounters(0, None, None)
@@ -0,0 +1,145 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from authentification.models import User
+from reviews.fanout import rebuild_timeline
+from reviews.feed import MaterializedTimeline, Timeline, flux_querysets
+from reviews.models import Review, Ticket, UserFollows
+from reviews.relations import relations_cache
+from reviews.seeding import seed_social_graph
+from reviews.tests.replica import ReplicaTestCase
+from reviews.views import PAGE_SIZE
+
+
+def keys(items):
+    return [(type(item).__name__, item.id) for item in items]
+
+
+class TimelineTests(TestCase):
+    """
+    The feed read by offset, by cursor in both directions and from the
+    materialized timelines must list the same items in the same order.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_social_graph(users=60, follows_per_user=8, ban_ratio=0.1,
+                          tickets_per_user=2, reviews_per_user=2)
+        cls.users = list(User.objects.order_by('id')[:10])
+
+        # items created at the same time are ordered by kind and id
+        first = Ticket.objects.order_by('id').first()
+        Review.objects.filter(id__lte=20).update(
+            time_created=first.time_created)
+        Ticket.objects.filter(id__lte=20).update(
+            time_created=first.time_created)
+
+    def setUp(self):
+        relations_cache().clear()
+
+    def walk(self, timeline, size):
+        page = timeline.page(None, size)
+        pages = [page]
+        while page.has_next():
+            page = timeline.page(page.next_cursor, size)
+            pages.append(page)
+
+        backwards = keys(page)
+        while page.has_previous():
+            page = timeline.page(page.previous_cursor, size)
+            backwards = keys(page) + backwards
+
+        return [key for page in pages for key in keys(page)], backwards
+
+    def test_cursor_pages_follow_the_offset_order(self):
+        for user in self.users:
+            timeline = Timeline(*flux_querysets(user))
+            expected = keys(timeline[0:timeline.count()])
+
+            for size in (1, 4, 6):
+                forwards, backwards = self.walk(timeline, size)
+                self.assertEqual(forwards, expected)
+                self.assertEqual(backwards, expected)
+
+    def test_invalid_cursor_gives_the_first_page(self):
+        timeline = Timeline(*flux_querysets(self.users[0]))
+        self.assertEqual(keys(timeline.page('not-a-cursor', 6)),
+                         keys(timeline.page(None, 6)))
+
+    @override_settings(MATERIALIZED_TIMELINE=True)
+    def test_materialized_timeline_follows_the_relationships(self):
+        for user in User.objects.all():
+            rebuild_timeline(user)
+        author, reader, other = self.users[:3]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserFollows.objects.update_or_create(
+                user=reader, followed_user=author,
+                defaults={'banned': False})
+            ticket = Ticket.objects.create(title='Nouveau', description='',
+                                           user=author,
+                                           picture='default_1.webp')
+            Review.objects.create(ticket=ticket, user=other, rating=3,
+                                  headline='Avis')
+            UserFollows.objects.update_or_create(
+                user=other, followed_user=reader,
+                defaults={'banned': True})
+            Ticket.objects.filter(user=author).first().delete()
+
+        for user in self.users:
+            live = Timeline(*flux_querysets(user))
+            materialized = MaterializedTimeline(user)
+            self.assertEqual(keys(materialized[0:materialized.count()]),
+                             keys(live[0:live.count()]))
+            self.assertEqual(self.walk(materialized, 5)[0],
+                             keys(live[0:live.count()]))
+
+
+class FluxItemsTests(ReplicaTestCase):
+    """
+    The "load more" endpoint sends the items of the next pages of the feed,
+    and nothing when the client already has them.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_social_graph(users=30, follows_per_user=6, ban_ratio=0,
+                          tickets_per_user=2, reviews_per_user=2)
+        cls.member = User.objects.order_by('id').first()
+
+    def setUp(self):
+        relations_cache().clear()
+        self.client.force_login(self.member)
+
+    def test_items_follow_the_feed_pages(self):
+        page = self.client.get(reverse('flux')).context['page_obj']
+        timeline = Timeline(*flux_querysets(self.member))
+        second = timeline.page(page.next_cursor, PAGE_SIZE)
+
+        response = self.client.get(reverse('flux_items'),
+                                   {'cursor': page.next_cursor})
+        self.assertEqual(response['X-Next-Cursor'], second.next_cursor or '')
+        for item in second:
+            self.assertContains(response, item.headline
+                                if isinstance(item, Review) else item.title)
+
+        response = self.client.get(reverse('flux_items'),
+                                   {'cursor': page.next_cursor,
+                                    'format': 'json'})
+        self.assertEqual(response.json()['next_cursor'], second.next_cursor)
+
+    def test_changed_item_changes_the_etag(self):
+        response = self.client.get(reverse('flux_items'))
+        etag = response['ETag']
+
+        response = self.client.get(reverse('flux_items'),
+                                   headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        timeline = Timeline(*flux_querysets(self.member))
+        timeline.page(None, PAGE_SIZE).object_list[0].save()
+        response = self.client.get(reverse('flux_items'),
+                                   headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+
+from reviews.counters import repair_ticket_counters
+from reviews.models import Review, Ticket
+
+
+class DemoFixtureTests(TestCase):
+    """
+    The fixture loaded by the setup of the README is still valid.
+    """
+
+    def test_fixture_loads(self):
+        call_command('loaddata', settings.BASE_DIR / 'dump_140325.json',
+                     verbosity=0)
+
+        self.assertEqual(Ticket.objects.count(), 17)
+        self.assertEqual(Review.objects.count(), 15)
+        for model in (Ticket, Review):
+            for time_created, time_updated in model.objects.values_list(
+                    'time_created', 'time_updated'):
+                self.assertEqual(time_updated, time_created)
+
+        # the counters of the answered tickets are loaded with them
+        self.assertEqual(repair_ticket_counters(), 0)
+        self.assertEqual(Ticket.objects.filter(review_count=0).count(), 3)
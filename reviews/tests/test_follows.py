@@ -0,0 +1,107 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from authentification.models import User
+from reviews.models import TimelineEntry, Ticket, UserFollows
+from reviews.relations import get_relations, relations_cache
+
+
+class BulkFollowsTests(TestCase):
+    """
+    Batches of follows, unfollows, bans and unbans are written with a few
+    queries, whatever their size, and refresh the cached relationships.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = User.objects.create_user('membre', 'm@example.com',
+                                              'Invit1234')
+        cls.others = User.objects.bulk_create(
+            [User(username=f'autre{n}', email=f'autre{n}@example.com')
+             for n in range(30)])
+        cls.ids = [user.id for user in cls.others]
+
+        # the first one has banned the member, who can't follow him
+        UserFollows.objects.create(user=cls.others[0],
+                                   followed_user=cls.member, banned=True)
+
+    def setUp(self):
+        relations_cache().clear()
+        self.client.force_login(self.member)
+
+    def post(self, action, ids, queries):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                reverse('bulk_follows'),
+                {'action': action, 'user_ids': ','.join(map(str, ids))})
+        self.assertEqual(response.status_code, 200)
+        # the same for any number of users
+        self.assertLessEqual(len(context), queries)
+        return response.json()['changed']
+
+    def test_follow_then_unfollow(self):
+        # cached before the batch, dropped by it
+        self.assertEqual(get_relations(self.member.id).following, set())
+
+        self.assertEqual(self.post('follow', self.ids, 9), 29)
+        following = get_relations(self.member.id).following
+        self.assertEqual(following, set(self.ids[1:]))
+
+        self.assertEqual(self.post('unfollow', self.ids[:10], 9), 9)
+        self.assertEqual(get_relations(self.member.id).following,
+                         set(self.ids[10:]))
+
+    def test_ban_then_unban(self):
+        self.post('follow', self.ids[10:], 9)
+
+        self.assertEqual(self.post('ban', self.ids[5:15], 10), 10)
+        relations = get_relations(self.member.id)
+        self.assertEqual(relations.banned, set(self.ids[5:15]))
+        self.assertEqual(relations.following, set(self.ids[15:]))
+
+        self.assertEqual(self.post('unban', self.ids, 9), 10)
+        self.assertEqual(get_relations(self.member.id).banned, set())
+
+    def test_unchanged_relationships_are_not_counted(self):
+        self.post('follow', self.ids[10:20], 9)
+        self.assertEqual(self.post('follow', self.ids[10:20], 9), 0)
+
+        self.assertEqual(self.post('ban', self.ids[15:25], 10), 10)
+        self.assertEqual(self.post('ban', self.ids[15:25], 10), 0)
+
+    def test_other_timelines_are_rebuilt_in_background(self):
+        Ticket.objects.create(title='Dune', description='SF',
+                              user=self.others[1])
+
+        with self.settings(MATERIALIZED_TIMELINE=True), \
+                mock.patch('reviews.follows.get_executor') as executor, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.post('follow', self.ids, 30)
+
+        # the member's own timeline is ready, the others are queued
+        self.assertTrue(TimelineEntry.objects.filter(
+            owner=self.member).exists())
+        executor().submit.assert_called_once()
+        self.assertEqual(executor().submit.call_args.args[1],
+                         set(self.ids[1:]))
+
+    def test_invalid_batch(self):
+        response = self.client.post(reverse('bulk_follows'),
+                                    {'action': 'follow', 'user_ids': 'a,b'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('user_ids', response.json()['errors'])
+
+    def test_command(self):
+        out = StringIO()
+        call_command('bulk_follows', 'membre', 'follow', *self.ids,
+                     batch_size=7, stdout=out)
+
+        self.assertIn('29 relationships changed in 5 batches', out.getvalue())
+        self.assertEqual(UserFollows.objects.filter(user=self.member).count(),
+                         29)
@@ -0,0 +1,84 @@
+from django.urls import reverse
+
+from authentification.models import User
+from reviews.fragments import (REVIEW_FRAGMENT, TICKET_FRAGMENT,
+                               fragment_key, fragments_cache)
+from reviews.models import Review, Ticket, UserFollows
+from reviews.relations import relations_cache
+from reviews.tests.replica import ReplicaTestCase
+
+
+class FragmentCacheTests(ReplicaTestCase):
+    """
+    The cards of the tickets and reviews are cached for every viewer, and
+    dropped when the ticket or the review changes.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('auteur', 'a@example.com',
+                                              'Invit1234')
+        cls.reader = User.objects.create_user('lecteur', 'l@example.com',
+                                              'Invit1234')
+        UserFollows.objects.create(user=cls.reader, followed_user=cls.author)
+
+    def setUp(self):
+        fragments_cache().clear()
+        relations_cache().clear()
+        self.ticket = Ticket.objects.create(title='Dune', description='SF',
+                                            user=self.author)
+
+    def flux(self, user):
+        self.client.force_login(user)
+        return self.client.get(reverse('flux')).content.decode()
+
+    def assertCached(self, name, instance, cached=True):
+        instance.refresh_from_db()
+        key = fragment_key(name, instance)
+        self.assertEqual(fragments_cache().get(key) is not None, cached)
+
+    def test_card_is_shared_but_buttons_are_not(self):
+        self.flux(self.author)
+        self.assertCached(TICKET_FRAGMENT, self.ticket)
+
+        content = self.flux(self.reader)
+        self.assertIn('Dune', content)
+        self.assertIn('Donner un avis', content)
+        self.assertNotIn('Supprimer', content)
+
+    def test_modified_ticket_is_rendered_again(self):
+        self.flux(self.reader)
+        former = fragment_key(TICKET_FRAGMENT, self.ticket)
+
+        self.client.force_login(self.author)
+        self.client.post(reverse('modify_ticket', args=[self.ticket.id]),
+                         {'title': 'Dune Messiah', 'description': 'SF'})
+
+        self.assertIsNone(fragments_cache().get(former))
+        self.assertIn('Dune Messiah', self.flux(self.reader))
+
+    def test_review_updates_the_ticket_card(self):
+        self.flux(self.reader)
+
+        Review.objects.create(ticket=self.ticket, user=self.reader,
+                              rating=4, headline='Culte')
+
+        content = self.flux(self.author)
+        self.assertIn('4.0 ★ (1 critique)', content)
+
+    def test_deleted_items_are_dropped(self):
+        review = Review.objects.create(ticket=self.ticket, user=self.author,
+                                       rating=4, headline='Culte')
+        self.flux(self.author)
+        self.assertCached(REVIEW_FRAGMENT, review)
+        self.assertCached(TICKET_FRAGMENT, self.ticket)
+
+        self.client.post(reverse('delete_review', args=[review.id]))
+        self.assertIsNone(
+            fragments_cache().get(fragment_key(REVIEW_FRAGMENT, review)))
+
+        self.flux(self.author)
+        self.assertCached(TICKET_FRAGMENT, self.ticket)
+        self.client.post(reverse('delete_ticket', args=[self.ticket.id]))
+        self.assertIsNone(fragments_cache().get(
+            fragment_key(TICKET_FRAGMENT, self.ticket)))
@@ -0,0 +1,262 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from PIL import Image
+
+from authentification.models import User
+from reviews.models import Ticket
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_upload(name='photo.png', size=(800, 600)):
+    content = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(content, 'PNG')
+    return SimpleUploadedFile(name, content.getvalue(),
+                              content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PROCESSING_WORKERS=0)
+class ImageProcessingTests(TestCase):
+    """
+    Uploaded pictures are stored as is by the request and converted once
+    the ticket is committed.
+    """
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user('lecteur', 'lecteur@example.com',
+                                             'Invit1234')
+        self.client.force_login(self.user)
+
+    def create_ticket(self):
+        return self.client.post(reverse('create_ticket'),
+                                {'title': 'Dune', 'description': 'SF',
+                                 'picture': make_upload()})
+
+    def test_request_does_not_convert_the_picture(self):
+        with mock.patch('reviews.images.process_ticket_picture') as process:
+            response = self.create_ticket()
+
+        self.assertRedirects(response, reverse('flux'),
+                             fetch_redirect_response=False)
+        process.assert_not_called()
+        ticket = Ticket.objects.get()
+        self.assertTrue(ticket.picture_processing)
+        self.assertTrue(ticket.picture.name.endswith('.png'))
+
+        response = self.client.get(reverse('user_posts'))
+        self.assertContains(response, 'Image en cours de traitement')
+
+    def test_derivatives_are_made_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_ticket()
+
+        ticket = Ticket.objects.get()
+        manifest = ticket.picture_derivatives
+        self.assertFalse(ticket.picture_processing)
+        self.assertEqual(ticket.picture.name, manifest['sources'][0]['name'])
+        self.assertTrue(default_storage.exists(manifest['original']))
+        self.assertTrue(manifest['placeholder'].startswith('data:image/webp'))
+
+        # the aspect ratio of the 800x600 upload is kept
+        self.assertEqual(
+            [(source['width'], source['height'])
+             for source in manifest['sources']],
+            [(180, 135), (360, 270), (540, 405)])
+        for source in manifest['sources']:
+            with default_storage.open(source['name']) as file:
+                with Image.open(file) as img:
+                    self.assertEqual(img.format, 'WEBP')
+                    self.assertEqual(img.width, source['width'])
+
+        response = self.client.get(reverse('user_posts'))
+        self.assertContains(response, 'srcset="')
+        self.assertContains(response, 'loading="lazy"')
+
+    @override_settings(IMAGE_DERIVATIVE_WIDTHS=[180, 360, 540, 1080])
+    def test_small_pictures_are_not_enlarged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('create_ticket'),
+                             {'title': 'Petit', 'description': 'SF',
+                              'picture': make_upload(size=(400, 500))})
+
+        # the widest version keeps the 400px of the upload
+        sources = Ticket.objects.get().picture_derivatives['sources']
+        self.assertEqual([source['width'] for source in sources],
+                         [180, 360, 400])
+
+    def modify_ticket(self, ticket, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse('modify_ticket', args=[ticket.id]),
+                {'title': 'Dune', 'description': 'SF', **data})
+
+    def test_cleared_picture_files_are_deleted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_ticket()
+        ticket = Ticket.objects.get()
+        manifest = ticket.picture_derivatives
+
+        self.modify_ticket(ticket, **{'picture-clear': 'on'})
+
+        ticket.refresh_from_db()
+        self.assertFalse(ticket.picture)
+        self.assertEqual(ticket.picture_derivatives, {})
+        for name in [manifest['original'],
+                     *(source['name'] for source in manifest['sources'])]:
+            self.assertFalse(default_storage.exists(name))
+        # the default cover is shown instead
+        response = self.client.get(reverse('flux'))
+        self.assertContains(response, reverse(
+            'ticket_cover', args=[ticket.id, ticket.cover_digest]))
+
+    def test_replaced_picture_files_are_deleted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_ticket()
+        ticket = Ticket.objects.get()
+        manifest = ticket.picture_derivatives
+
+        self.modify_ticket(ticket, picture=make_upload('autre.png'))
+
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.picture_derivatives['original'], 'autre.png')
+        self.assertFalse(default_storage.exists(manifest['original']))
+        self.assertFalse(default_storage.exists(
+            manifest['sources'][0]['name']))
+
+    def test_pending_pictures_are_processed_by_chunks(self):
+        for _ in range(3):
+            self.create_ticket()
+
+        output = io.StringIO()
+        call_command('process_pending_images', '--chunk-size', '2',
+                     stdout=output)
+
+        self.assertIn('3 pictures processed', output.getvalue())
+        self.assertFalse(Ticket.objects.filter(
+            picture_processing=True).exists())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class DefaultCoverTests(TestCase):
+    """
+    Tickets without picture get a cover drawn on demand, shared by the
+    tickets having the same title.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('auteur', 'auteur@example.com',
+                                            'Invit1234')
+
+    def create_ticket(self, title):
+        return Ticket.objects.create(title=title, description='',
+                                     user=self.user)
+
+    def cover_url(self, ticket):
+        return reverse('ticket_cover', args=[ticket.id, ticket.cover_digest])
+
+    def test_creation_does_no_image_io(self):
+        with mock.patch('reviews.images.draw_cover') as draw:
+            ticket = self.create_ticket('Les Misérables')
+        draw.assert_not_called()
+        self.assertFalse(ticket.picture)
+
+    def test_cover_is_drawn_once_and_shared(self):
+        first = self.create_ticket('Germinal')
+        second = self.create_ticket('Germinal')
+
+        response = self.client.get(self.cover_url(first))
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response['ETag'], f'"{first.cover_digest}"')
+        self.assertIn('immutable', response['Cache-Control'])
+        b''.join(response.streaming_content)
+
+        with mock.patch('reviews.images.draw_cover') as draw:
+            with self.assertNumQueries(0):
+                response = self.client.get(self.cover_url(second))
+        draw.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        b''.join(response.streaming_content)
+
+    def test_cover_is_not_sent_again(self):
+        ticket = self.create_ticket('Candide')
+        response = self.client.get(
+            self.cover_url(ticket),
+            HTTP_IF_NONE_MATCH=f'"{ticket.cover_digest}"')
+        self.assertEqual(response.status_code, 304)
+
+    def test_cover_of_another_title_is_not_found(self):
+        ticket = self.create_ticket('Zadig')
+        url = reverse('ticket_cover', args=[ticket.id, 'f' * 32])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ReprocessCoversTests(TestCase):
+    """
+    The `reprocess_covers` command remakes the derivatives of the pictures
+    whose original or image settings have changed.
+    """
+
+    def setUp(self):
+        user = User.objects.create_user('auteur', 'auteur@example.com',
+                                        'Invit1234')
+        self.tickets = []
+        for n in range(3):
+            name = default_storage.save(f'ancienne_{n}.webp', make_upload(
+                size=Ticket.IMAGE_SIZE))
+            self.tickets.append(Ticket.objects.create(
+                title=f'Livre {n}', description='', user=user,
+                picture=name))
+
+    def reprocess(self, *args):
+        output = io.StringIO()
+        call_command('reprocess_covers', '--workers', '0',
+                     '--chunk-size', '2', *args, stdout=output)
+        return output.getvalue()
+
+    def test_legacy_covers_get_derivatives(self):
+        output = self.reprocess()
+
+        self.assertIn('3 pictures processed, 0 skipped', output)
+        for ticket in self.tickets:
+            original = ticket.picture.name
+            ticket.refresh_from_db()
+            manifest = ticket.picture_derivatives
+            self.assertEqual(manifest['original'], original)
+            # the 141px wide covers are not enlarged
+            self.assertEqual([source['width']
+                              for source in manifest['sources']], [141])
+
+    def test_unchanged_pictures_are_skipped(self):
+        self.reprocess()
+        self.assertIn('0 pictures processed, 3 skipped', self.reprocess())
+
+        with self.settings(IMAGE_DERIVATIVE_QUALITY=60):
+            self.assertIn('3 pictures processed', self.reprocess())
+
+    def test_interrupted_run_is_resumed(self):
+        with mock.patch.object(default_storage, 'delete'):
+            with mock.patch('reviews.management.commands.reprocess_covers'
+                            '.Command.process_chunk',
+                            side_effect=[None, KeyboardInterrupt]):
+                with self.assertRaises(KeyboardInterrupt):
+                    self.reprocess()
+
+        output = self.reprocess()
+        self.assertIn(f'Resuming after ticket {self.tickets[1].id}', output)
+        self.assertIn('1 pictures processed', output)
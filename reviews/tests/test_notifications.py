@@ -0,0 +1,118 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from authentification.models import User
+from reviews.feed import Timeline, flux_querysets
+from reviews.models import Ticket, UserFollows
+from reviews.notifications import broker, new_posts_stream
+from reviews.relations import relations_cache
+from reviews.tests.replica import ReplicaTestCase
+
+
+@override_settings(NOTIFICATIONS_POLL_INTERVAL=60,
+                   NOTIFICATIONS_STREAM_DURATION=60)
+class NewPostsStreamTests(TestCase):
+    """
+    The feed streams announce the new items when they are published in the
+    process, or found by polling the database.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('auteur', 'a@example.com',
+                                              'Invit1234')
+        cls.reader = User.objects.create_user('lecteur', 'l@example.com',
+                                              'Invit1234')
+        UserFollows.objects.create(user=cls.reader, followed_user=cls.author)
+        Ticket.objects.create(title='Dune', description='SF', user=cls.author)
+
+    def setUp(self):
+        relations_cache().clear()
+
+    def head_cursor(self):
+        return Timeline(*flux_querysets(self.reader)).page().head_cursor
+
+    def post_ticket(self, publish=True):
+        with self.captureOnCommitCallbacks(execute=publish):
+            Ticket.objects.create(title='Hyperion', description='SF',
+                                  user=self.author)
+
+    async def open_stream(self):
+        cursor = await sync_to_async(self.head_cursor)()
+        stream = new_posts_stream(self.reader, cursor)
+        self.assertTrue((await anext(stream)).startswith('retry:'))
+        self.assertEqual(await anext(stream), ': keep-alive\n\n')
+        return stream
+
+    def test_count_newer(self):
+        cursor = self.head_cursor()
+        timeline = Timeline(*flux_querysets(self.reader))
+        self.assertEqual(timeline.count_newer(cursor), 0)
+        self.assertEqual(timeline.count_newer(None), 1)
+
+        self.post_ticket()
+        self.assertEqual(timeline.count_newer(cursor), 1)
+
+    async def test_published_post_wakes_the_stream(self):
+        stream = await self.open_stream()
+        try:
+            await sync_to_async(self.post_ticket)()
+            event = await asyncio.wait_for(anext(stream), 5)
+        finally:
+            await stream.aclose()
+
+        self.assertTrue(event.startswith('event: new-posts\n'))
+        self.assertIn('"count": 1', event)
+        self.assertIn(f'"url": "{reverse("flux")}"', event)
+        self.assertFalse(broker.has_subscribers())
+
+    @override_settings(NOTIFICATIONS_POLL_INTERVAL=0.05)
+    async def test_post_of_another_worker_is_polled(self):
+        stream = await self.open_stream()
+        try:
+            # saved by another process: nothing is published here
+            await sync_to_async(self.post_ticket)(publish=False)
+            event = await asyncio.wait_for(anext(stream), 5)
+        finally:
+            await stream.aclose()
+
+        self.assertIn('"count": 1', event)
+
+    @override_settings(NOTIFICATIONS_STREAM_DURATION=0)
+    async def test_endpoint_streams_events(self):
+        await self.async_client.aforce_login(self.reader)
+        response = await self.async_client.get(reverse('new_posts'))
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = b''.join([chunk async for chunk
+                            in response.streaming_content])
+        self.assertTrue(content.startswith(b'retry: 5000'))
+
+
+class NewPostsPageTests(ReplicaTestCase):
+    """
+    The feed only opens the stream when served by the ASGI handler, the
+    WSGI one would hold a worker for the whole stream.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user('lecteur', 'l@example.com',
+                                              'Invit1234')
+
+    def test_not_streamed_under_wsgi(self):
+        self.client.force_login(self.reader)
+
+        self.assertNotContains(self.client.get(reverse('flux')),
+                               'EventSource')
+        self.assertEqual(self.client.get(reverse('new_posts')).status_code,
+                         204)
+
+    async def test_streamed_under_asgi(self):
+        await self.async_client.aforce_login(self.reader)
+
+        response = await self.async_client.get(reverse('flux'))
+        self.assertContains(response, 'EventSource')
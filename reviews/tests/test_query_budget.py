@@ -0,0 +1,237 @@
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+from django.db import connections
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from authentification.models import User
+from reviews.models import Review, Ticket, UserFollows
+from reviews.relations import get_relations, relations_cache
+from reviews.seeding import seed_social_graph
+from reviews.tests.replica import ReplicaTestCase
+
+
+class QueryBudgetTests(ReplicaTestCase):
+    """
+    Upper bounds on the SQL queries and the time of the reviews views.
+
+    The database is seeded with a social graph of a few thousand users, and
+    the requests are made by the member following the most users. The
+    budgets do not depend on the amount of data, so a query per rendered
+    item (N+1) or per relationship makes them fail.
+    """
+    USERS = 2000
+    MAX_SECONDS = 1.0
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_social_graph(users=cls.USERS, follows_per_user=20,
+                          ban_ratio=0.05, tickets_per_user=3,
+                          reviews_per_user=3)
+
+        cls.member = (User.objects.annotate(followings=Count('following'))
+                      .order_by('-followings').first())
+        relations = get_relations(cls.member.id)
+
+        cls.followed = User.objects.get(id=min(relations.following))
+        cls.follower = User.objects.filter(
+            id__in=relations.followers - relations.banned).first()
+        cls.stranger = User.objects.exclude(
+            id__in={cls.member.id, *relations.following, *relations.banned,
+                    *relations.followers, *relations.banning}).first()
+
+        cls.ticket = Ticket.objects.filter(user=cls.followed).exclude(
+            review__user=cls.member).first()
+        cls.review = Review.objects.filter(user=cls.member).first()
+
+    def setUp(self):
+        # every request starts without cached relationships
+        relations_cache().clear()
+        self.client.force_login(self.member)
+
+    @contextmanager
+    def assertBudget(self, queries, seconds=None):
+        # the queries of both the primary and the replica databases
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            start = time.perf_counter()
+            yield
+            elapsed = time.perf_counter() - start
+
+        captured = primary.captured_queries + replica.captured_queries
+        self.assertLessEqual(
+            len(captured), queries,
+            '\n'.join(query['sql'] for query in captured))
+        self.assertLess(elapsed, seconds or self.MAX_SECONDS)
+
+    def test_flux(self):
+        with self.assertBudget(7):
+            response = self.client.get(reverse('flux'))
+        self.assertEqual(len(response.context['page_obj']), 6)
+
+    def test_flux_next_page(self):
+        cursor = self.client.get(
+            reverse('flux')).context['page_obj'].next_cursor
+        relations_cache().clear()
+
+        with self.assertBudget(7):
+            response = self.client.get(reverse('flux'), {'cursor': cursor})
+        self.assertEqual(len(response.context['page_obj']), 6)
+
+    def test_flux_offset_page(self):
+        with self.assertBudget(8):
+            response = self.client.get(reverse('flux'), {'page': 3})
+        self.assertEqual(response.context['page_obj'].number, 3)
+
+    def test_flux_does_not_depend_on_page_size(self):
+        with mock.patch('reviews.views.PAGE_SIZE', 50):
+            with self.assertBudget(7):
+                response = self.client.get(reverse('flux'))
+        self.assertEqual(len(response.context['page_obj']), 50)
+
+    def test_flux_items(self):
+        cursor = self.client.get(
+            reverse('flux')).context['page_obj'].next_cursor
+        relations_cache().clear()
+
+        with self.assertBudget(7):
+            response = self.client.get(reverse('flux_items'),
+                                       {'cursor': cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b'<html', response.content)
+
+        relations_cache().clear()
+        with self.assertBudget(7):
+            response = self.client.get(
+                reverse('flux_items'), {'cursor': cursor},
+                headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_user_posts(self):
+        with self.assertBudget(7):
+            response = self.client.get(reverse('user_posts'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow(self):
+        with self.assertBudget(6):
+            response = self.client.get(reverse('follow'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow_pages(self):
+        relations = get_relations(self.member.id)
+        relations_cache().clear()
+
+        followers, after = [], None
+        with mock.patch('reviews.views.FOLLOW_PAGE_SIZE', 5):
+            while True:
+                with self.assertBudget(6):
+                    response = self.client.get(
+                        reverse('follow'),
+                        {'followers_after': after} if after else {})
+                page = response.context['followers_page']
+                followers += page.users
+                after = page.next_after
+                if after is None:
+                    break
+
+        self.assertEqual({user.id for user in followers},
+                         relations.followers)
+        self.assertEqual({user.id for user in followers
+                          if user.banned_by_user},
+                         relations.followers & relations.banned)
+        self.assertEqual(response.context['counts'].followers,
+                         len(relations.followers))
+
+    def test_follow_post(self):
+        with self.assertBudget(5):
+            response = self.client.post(reverse('follow'),
+                                        {'user': self.stranger.id})
+        self.assertRedirects(response, reverse('follow'),
+                             fetch_redirect_response=False)
+        self.assertTrue(UserFollows.objects.filter(
+            user=self.member, followed_user=self.stranger).exists())
+
+    def test_follow_post_of_a_followed_user(self):
+        response = self.client.post(reverse('follow'),
+                                    {'user': self.followed.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors)
+
+    def test_search_users(self):
+        followed = self.followed.username
+        with self.assertBudget(3):
+            response = self.client.get(reverse('search_users'),
+                                       {'q': followed.upper()})
+        usernames = [user['username'] for user in response.json()['results']]
+        self.assertNotIn(followed, usernames)
+        self.assertTrue(all(username.startswith(followed)
+                            for username in usernames))
+
+        with self.assertBudget(3):
+            response = self.client.get(reverse('search_users'),
+                                       {'q': self.stranger.username})
+        self.assertEqual(response.json()['results'][0],
+                         {'id': self.stranger.id,
+                          'username': self.stranger.username})
+
+    def test_answer_ticket(self):
+        url = reverse('answer_ticket', args=[self.ticket.id])
+        with self.assertBudget(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_answer_ticket_post(self):
+        url = reverse('answer_ticket', args=[self.ticket.id])
+        # the review and the counters of its ticket are written in a
+        # savepoint: SAVEPOINT, INSERT, UPDATE, RELEASE
+        with self.assertBudget(7):
+            response = self.client.post(url, {'headline': 'Titre',
+                                              'rating': 4,
+                                              'body': 'Avis'})
+        self.assertRedirects(response, reverse('flux'),
+                             fetch_redirect_response=False)
+
+    def test_modify_review(self):
+        url = reverse('modify_review', args=[self.review.id])
+        with self.assertBudget(4):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_modify_review_post(self):
+        url = reverse('modify_review', args=[self.review.id])
+        with self.assertBudget(8):
+            response = self.client.post(url, {'headline': 'Titre',
+                                              'rating': 2,
+                                              'body': 'Avis'})
+        self.assertRedirects(response, reverse('flux'),
+                             fetch_redirect_response=False)
+
+    def test_unfollow(self):
+        with self.assertBudget(6):
+            self.client.get(reverse('unfollow', args=[self.followed.id]))
+        self.assertFalse(UserFollows.objects.filter(
+            user=self.member, followed_user=self.followed).exists())
+
+    def test_unsubscribe_followers(self):
+        url = reverse('unsubscribe_followers', args=[self.follower.id])
+        with self.assertBudget(5):
+            self.client.get(url)
+        self.assertFalse(UserFollows.objects.filter(
+            user=self.follower, followed_user=self.member).exists())
+
+    def test_ban_and_unban_followers(self):
+        with self.assertBudget(5):
+            self.client.get(reverse('ban_followers',
+                                    args=[self.follower.id]))
+        self.assertTrue(UserFollows.objects.filter(
+            user=self.member, followed_user=self.follower,
+            banned=True).exists())
+
+        with self.assertBudget(6):
+            self.client.get(reverse('unban_followers',
+                                    args=[self.follower.id]))
+        self.assertFalse(UserFollows.objects.filter(
+            user=self.member, followed_user=self.follower).exists())
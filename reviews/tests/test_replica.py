@@ -0,0 +1,171 @@
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.db import connections
+from django.http import HttpResponse
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from authentification.models import User
+from reviews.fragments import fragments_cache
+from reviews.middleware import PIN_COOKIE, ReplicaMiddleware
+from reviews.models import Ticket, UserFollows
+from reviews.relations import relations_cache
+from reviews.routers import ReplicaRouter, use_replica
+from reviews.tests.replica import ReplicaTestCase
+
+
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_go_to_the_replica_only_when_allowed(self):
+        self.assertIsNone(self.router.db_for_read(Ticket))
+
+        token = use_replica.set(True)
+        try:
+            self.assertEqual(self.router.db_for_read(Ticket), 'replica')
+            self.assertEqual(self.router.db_for_write(Ticket), 'default')
+        finally:
+            use_replica.reset(token)
+
+    def test_missing_replica_reads_the_primary(self):
+        token = use_replica.set(True)
+        try:
+            with override_settings(REPLICA_DATABASE='absent'):
+                self.assertIsNone(self.router.db_for_read(Ticket))
+        finally:
+            use_replica.reset(token)
+
+    def test_replica_is_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'reviews'))
+        self.assertIsNone(self.router.allow_migrate('default', 'reviews'))
+
+
+def feed_queries(context) -> int:
+    """
+    Counts the queries of a captured context, except those reading the
+    relationships, which are always read from the primary database as they
+    are cached.
+    """
+    return sum('reviews_userfollows' not in query['sql']
+               for query in context.captured_queries)
+
+
+class ReplicaMiddlewareTests(SimpleTestCase):
+
+    def test_runs_in_the_mode_of_the_handler(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertTrue(iscoroutinefunction(middleware.process_view))
+
+        middleware = ReplicaMiddleware(lambda request: HttpResponse())
+        self.assertFalse(iscoroutinefunction(middleware))
+        self.assertFalse(iscoroutinefunction(middleware.process_view))
+
+
+class ReplicaRoutingTests(ReplicaTestCase):
+    """
+    The feed views read the replica database, unless the client has just
+    written something.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('auteur', 'a@example.com',
+                                              'Invit1234')
+        cls.reader = User.objects.create_user('lecteur', 'l@example.com',
+                                              'Invit1234')
+        UserFollows.objects.create(user=cls.reader, followed_user=cls.author)
+        Ticket.objects.create(title='Dune', description='SF', user=cls.author)
+
+    def setUp(self):
+        fragments_cache().clear()
+        relations_cache().clear()
+        self.client.force_login(self.reader)
+
+    def get(self, name):
+        """
+        Returns the response to a GET request, and the number of queries
+        made on the primary, apart from the relationships, and on the
+        replica databases.
+        """
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(reverse(name))
+        self.assertEqual(response.status_code, 200)
+        return response, feed_queries(primary), len(replica)
+
+    def test_feed_views_read_the_replica(self):
+        for name in ('flux', 'user_posts', 'follow'):
+            with self.subTest(name):
+                relations_cache().clear()
+                _, primary, replica = self.get(name)
+                self.assertEqual(primary, 0)
+                self.assertGreater(replica, 0)
+
+    def test_cached_relationships_read_the_primary(self):
+        # a lagging replica would cache the relationships before a ban
+        for name in ('flux', 'follow'):
+            with self.subTest(name):
+                relations_cache().clear()
+                with CaptureQueriesContext(connections['default']) as primary:
+                    self.client.get(reverse(name))
+                self.assertGreater(len(primary), 0)
+                self.assertEqual(feed_queries(primary), 0)
+
+    def test_other_views_read_the_primary(self):
+        _, primary, replica = self.get('create_ticket')
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_writes_go_to_the_primary(self):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.post(reverse('create_ticket'),
+                                        {'title': 'Hyperion',
+                                         'description': 'SF'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(replica), 0)
+
+    def test_client_reads_its_writes(self):
+        self.client.post(reverse('create_ticket'),
+                         {'title': 'Hyperion', 'description': 'SF'})
+        self.assertIn(PIN_COOKIE, self.client.cookies)
+
+        response, primary, replica = self.get('flux')
+        self.assertContains(response, 'Hyperion')
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        # once the pin has expired, the replica has caught up
+        del self.client.cookies[PIN_COOKIE]
+        relations_cache().clear()
+        _, primary, replica = self.get('flux')
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_pin_lasts_the_stickiness_delay(self):
+        with self.settings(REPLICA_STICKINESS=3):
+            self.client.post(reverse('create_ticket'),
+                             {'title': 'Hyperion', 'description': 'SF'})
+        self.assertEqual(self.client.cookies[PIN_COOKIE]['max-age'], 3)
+
+    def test_async_handler_routes_the_reads(self):
+        # the requests go through the ASGI handler, the queries are made
+        # by this thread
+        async_to_sync(self.async_client.aforce_login)(self.reader)
+
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = async_to_sync(self.async_client.get)(reverse('flux'))
+        self.assertContains(response, 'Dune')
+        self.assertEqual(feed_queries(primary), 0)
+        self.assertGreater(len(replica), 0)
+
+        response = async_to_sync(self.async_client.post)(
+            reverse('create_ticket'), {'title': 'Hyperion',
+                                       'description': 'SF'})
+        self.assertIn(PIN_COOKIE, response.cookies)
@@ -0,0 +1,47 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, F
+from django.test import TestCase
+
+from authentification.models import User
+from reviews.counters import repair_ticket_counters
+from reviews.models import Review, Ticket, UserFollows
+from reviews.seeding import seed_social_graph
+
+
+class SeedingTests(TestCase):
+    """
+    The synthetic social graph has the requested counts and shapes.
+    """
+
+    def test_power_law_followers(self):
+        counts = seed_social_graph(users=200, follows_per_user=10,
+                                   follower_exponent=1.5, ban_ratio=0,
+                                   image_ratio=0)
+
+        followers = sorted(User.objects.annotate(
+            count=Count('followers')).values_list('count', flat=True))
+        average = counts['follows'] / counts['users']
+        # a few members are followed by almost everyone
+        self.assertGreater(followers[-1], 5 * average)
+        self.assertEqual(counts['follows'], UserFollows.objects.count())
+        self.assertEqual(counts['pictures'], 0)
+        self.assertFalse(Ticket.objects.exclude(picture='').exists())
+
+    def test_command(self):
+        out = StringIO()
+        call_command('seed_litrevu', users=30, image_ratio=0.5, stdout=out)
+
+        self.assertIn('30 users', out.getvalue())
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Ticket.objects.count(), 90)
+        # the seeded reviews were never edited
+        self.assertFalse(Review.objects.exclude(
+            time_updated=F('time_created')).exists())
+        self.assertEqual(repair_ticket_counters(), 0)
+
+    def test_invalid_ratio(self):
+        with self.assertRaises(CommandError):
+            call_command('seed_litrevu', users=1, ban_ratio=2)
@@ -0,0 +1,66 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from authentification.models import User
+from reviews.models import Review, Ticket, UserFollows
+from reviews.seeding import seed_social_graph
+from reviews.snapshots import export_snapshot, import_snapshot
+
+
+def dump(model, *fields):
+    return list(model.objects.order_by('pk').values_list('pk', *fields))
+
+
+class SnapshotTests(TestCase):
+    """
+    The data exported as JSON lines is imported back as it was.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_social_graph(users=20, follows_per_user=4, ban_ratio=0.2,
+                          tickets_per_user=2, reviews_per_user=2)
+
+    def snapshot(self):
+        return {
+            'users': dump(User, 'username', 'password', 'date_joined'),
+            'tickets': dump(Ticket, 'user', 'title', 'time_created',
+                            'time_updated', 'review_count', 'rating_total'),
+            'reviews': dump(Review, 'ticket', 'user', 'rating',
+                            'time_created'),
+            'follows': dump(UserFollows, 'user', 'followed_user', 'banned'),
+        }
+
+    def export_and_clear(self):
+        stream = StringIO()
+        counts = export_snapshot(stream, batch_size=7)
+        User.objects.all().delete()
+        stream.seek(0)
+        return stream, counts
+
+    def test_round_trip(self):
+        expected = self.snapshot()
+        stream, exported = self.export_and_clear()
+
+        imported = import_snapshot(stream, batch_size=7,
+                                   process_images=False)
+
+        self.assertEqual(imported, exported)
+        self.assertEqual(exported['ticket'], 40)
+        self.assertEqual(self.snapshot(), expected)
+        self.assertFalse(Ticket.objects.filter(
+            picture_processing=True).exists())
+
+    def test_pictures_wait_for_their_processing(self):
+        stream, _ = self.export_and_clear()
+        import_snapshot(stream, process_images=True)
+
+        self.assertEqual(Ticket.objects.filter(picture_processing=True)
+                         .count(), 40)
+
+    def test_invalid_line(self):
+        with self.assertRaises(CommandError):
+            call_command('import_litrevu', '-', stdin=StringIO('{"model":'))
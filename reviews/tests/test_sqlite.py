@@ -0,0 +1,29 @@
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+
+from reviews.sqlite import apply_sqlite_pragmas
+
+
+class SqlitePragmasTests(SimpleTestCase):
+    databases = {'default'}
+
+    def pragmas(self):
+        with connection.cursor() as cursor:
+            return [cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                    for name in ('busy_timeout', 'synchronous',
+                                 'cache_size')]
+
+    def test_connections_are_tuned(self):
+        # synchronous NORMAL is read back as 1
+        self.assertEqual(self.pragmas(), [5000, 1, -20000])
+
+    def test_pragmas_come_from_the_settings(self):
+        try:
+            with override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234,
+                                                   'cache_size': -4000}):
+                apply_sqlite_pragmas(sender=type(connection),
+                                     connection=connection)
+                self.assertEqual(self.pragmas(), [1234, 1, -4000])
+        finally:
+            apply_sqlite_pragmas(sender=type(connection),
+                                 connection=connection)
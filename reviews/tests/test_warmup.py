@@ -0,0 +1,25 @@
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from LITRevu.warmup import warm_templates
+
+
+class TemplatesWarmupTests(SimpleTestCase):
+
+    def test_every_project_template_compiles(self):
+        templates = [*settings.BASE_DIR.glob('templates/**/*.html'),
+                     *settings.BASE_DIR.glob('*/templates/**/*.html')]
+
+        self.assertEqual(warm_templates(), len(templates))
+
+    def test_installed_packages_are_not_compiled(self):
+        # Django installed in a virtualenv inside the project directory
+        site_packages = Path(django.__file__).parent.parent
+        with self.settings(BASE_DIR=site_packages):
+            count = warm_templates()
+
+        self.assertEqual(
+            count, len(list(settings.BASE_DIR.glob('templates/**/*.html'))))
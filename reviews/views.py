@@ -1,80 +1,38 @@
-from itertools import chain
+import os
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified, JsonResponse,
+                         StreamingHttpResponse)
+from django.template.loader import render_to_string
 from django.shortcuts import render, get_object_or_404, redirect
 from django.utils.timezone import now
+from django.views.decorators.http import require_POST
 from django.urls import reverse
 from django.core.paginator import Paginator
-from django.db.models import Q, QuerySet
+from django.db.models import Q
 
 from authentification.models import User
 
 from .models import Review, Ticket, UserFollows
-from .forms import ReviewForm, TicketForm, FollowUserForm
+from .feed import Timeline, flux_timeline, page_etag, set_viewer_flags
+from . import follows
+from .forms import BulkFollowForm, ReviewForm, TicketForm, FollowUserForm
+from .images import cover_path, get_cover
+from .notifications import new_posts_stream, streams_events
+from .relations import (followers_list, followings_list, get_follow_counts,
+                        get_relations, search_users as find_users,
+                        users_page)
 
+# number of reviews and tickets displayed on a page of the feeds
+PAGE_SIZE = 6
 
-def get_banning_users(user: User) -> QuerySet:
-    """
-    Retrieves users who have banned the given user.
-
-    Args:
-        user (User): The user for whom we want to find blockers.
-
-    Returns:
-        QuerySet: A list of users who have banned the given user.
-    """
-    return User.objects.filter(
-        following__followed_user=user,
-        following__banned=True
-    )
-
+# number of users suggested by the search of the follow form
+SEARCH_LIMIT = 10
 
-def get_banned_users(user: User) -> QuerySet:
-    """
-    Retrieves the users that the given user has banned.
-
-    Args:
-        user (User): The user who has banned other users.
-
-    Returns:
-        QuerySet: A list of users who have been banned by the given user.
-    """
-    return User.objects.filter(
-        followers__user=user,
-        followers__banned=True
-    )
-
-
-def get_followers(user: User) -> QuerySet:
-    """
-    Retrieves the users who follow the given user, excluding those who have
-    banned him.
-
-    Args:
-        user (User): The user whose followers we want to retrieve.
-
-    Returns:
-        QuerySet: A list of users following the given user, excluding those who
-         have banned him.
-    """
-    banning_users = get_banning_users(user)
-    return User.objects.filter(
-        following__followed_user=user
-    ).exclude(id__in=banning_users)
-
-
-def get_followings(user: User) -> QuerySet:
-    """
-    those that the user follows less those who have banned him and those that
-    the user has banned
-    """
-    banning_users = get_banning_users(user)
-    banned_users = get_banned_users(user)
-    return User.objects.filter(
-        followers__user=user).exclude(
-        id__in=banning_users).exclude(
-        id__in=banned_users)
+# number of users displayed on a page of the follow lists
+FOLLOW_PAGE_SIZE = 50
 
 
 @login_required
@@ -120,7 +78,8 @@ def modify_ticket(request, ticket_id):
     Handle the modification of an existing ticket.
 
     This view allows a user to modify their own ticket. If the requesting user
-    is not the owner of the ticket, they are redirected to the 'flux' page.
+    is not the owner of the ticket, or if the ticket has been answered, they
+    are redirected to the 'flux' page.
     If the form is valid, the ticket is updated and the user is redirected to
     the 'user_posts' page. Otherwise, the form is displayed pre-filled with
     the existing ticket data.
@@ -137,7 +96,8 @@ def modify_ticket(request, ticket_id):
     """
     ticket = Ticket.objects.get(id=ticket_id)
 
-    if request.user != ticket.user:
+    # an answered ticket can't be modified anymore
+    if request.user.id != ticket.user_id or ticket.review_count:
         return redirect(reverse('flux'))
 
     if request.method == 'POST':
@@ -153,6 +113,41 @@ def modify_ticket(request, ticket_id):
                   {'form': form, 'ticket': ticket})
 
 
+def ticket_cover(request, ticket_id, digest):
+    """
+    Serve the default cover of a ticket without picture.
+
+    The cover is drawn the first time it is requested, then read from the
+    disk without any query. Its url holds the digest of the title, so the
+    response never changes and can be cached for good by the browsers.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        ticket_id (int): The ID of the ticket.
+        digest (str): The digest of the ticket's title.
+
+    Returns:
+        HttpResponse: The WebP cover, or a 304 response if the browser
+                      already has it.
+    """
+    etag = f'"{digest}"'
+    headers = {'ETag': etag,
+               'Cache-Control': 'public, max-age=31536000, immutable'}
+
+    if etag in request.headers.get('If-None-Match', ''):
+        return HttpResponseNotModified(headers=headers)
+
+    path = cover_path(digest)
+    if not os.path.exists(path):
+        ticket = get_object_or_404(Ticket, id=ticket_id)
+        if ticket.cover_digest != digest:
+            raise Http404("Couverture introuvable.")
+        path = get_cover(ticket.title, Ticket.IMAGE_SIZE)
+
+    return FileResponse(open(path, 'rb'), content_type='image/webp',
+                        headers=headers)
+
+
 def answer_ticket(request, ticket_id):
     """
     Handle the creation of a review in response to a ticket.
@@ -173,8 +168,9 @@ def answer_ticket(request, ticket_id):
                       ticket details or redirects to 'flux' upon successful
                       submission.
     """
+    ticket = Ticket.objects.select_related('user').get(id=ticket_id)
+
     if request.method == "POST":
-        ticket = Ticket.objects.get(id=ticket_id)
         review_form = ReviewForm(request.POST)
 
         if review_form.is_valid():
@@ -188,7 +184,6 @@ def answer_ticket(request, ticket_id):
 
     else:
         review_form = ReviewForm()
-        ticket = Ticket.objects.get(id=ticket_id)
 
     context = {
         'ticket': ticket,
@@ -219,7 +214,7 @@ def delete_ticket(request, ticket_id):
     """
     ticket = Ticket.objects.get(id=ticket_id)
 
-    if request.user != ticket.user:
+    if request.user.id != ticket.user_id:
         return redirect(reverse('flux'))
 
     if request.method == 'POST':
@@ -298,10 +293,10 @@ def modify_review(request, review_id):
                       successful submission.
     """
     review = Review.objects.get(id=review_id)
-    if request.user != review.user:
+    if request.user.id != review.user_id:
         return redirect(reverse('flux'))
 
-    ticket = Ticket.objects.get(id=review.ticket_id)
+    ticket = Ticket.objects.select_related('user').get(id=review.ticket_id)
     if request.method == 'POST':
         review_form = ReviewForm(request.POST, instance=review)
         if review_form.is_valid():
@@ -339,7 +334,7 @@ def delete_review(request, review_id):
     """
     review = Review.objects.get(id=review_id)
 
-    if request.user != review.user:
+    if request.user.id != review.user_id:
         return redirect(reverse('flux'))
 
     if request.method == 'POST':
@@ -358,7 +353,10 @@ def flux(request):
     following users.
 
     This view retrieves and paginates reviews and tickets from the user and
-    the users he follows, while excluding content from banned users.
+    the users he follows, while excluding content from banned users. The
+    timeline is merged and sliced by the database, so only the rows of the
+    requested page are loaded. Pages are read after the `?cursor=` parameter,
+    the offset `?page=` parameter of older links is still supported.
 
     Args:
         request (HttpRequest): The HTTP request object.
@@ -367,57 +365,99 @@ def flux(request):
         HttpResponse: The feed page with paginated reviews and tickets.
     """
 
-    banning_users = get_banning_users(request.user)
+    # merged and paginated by the database, only the page is loaded
+    timeline = flux_timeline(request.user)
+
+    page_number = request.GET.get('page')
+    if page_number is not None:
+        # offset pagination is kept for the links of the former navigation
+        page_obj = Paginator(timeline, PAGE_SIZE).get_page(page_number)
+    else:
+        page_obj = timeline.page(request.GET.get('cursor'), PAGE_SIZE)
+
+    # the buttons displayed on each item are decided here, in one pass
+    set_viewer_flags(page_obj.object_list, request.user)
+
+    context = {
+        'page_obj': page_obj,
+        'notifications': streams_events(request),
+    }
+    return render(request,
+                  'reviews/flux.html',
+                  context)
+
+
+@login_required
+def flux_items(request):
+    """
+    Return the items of the feed page following `?cursor=`, without the
+    page layout, for the "load more" button of the feed.
 
-    banned_users = get_banned_users(request.user)
+    The response is the HTML of the items, the cursor of the next page
+    being sent in the `X-Next-Cursor` header, or a JSON object holding
+    both with `?format=json`. Its ETag varies on everything the items
+    display, so a client asking again for an unchanged page gets an empty
+    304 response and nothing is rendered.
 
-    following_users = get_followings(request.user)
+    Args:
+        request (HttpRequest): The HTTP request object.
 
-    users = chain([request.user], following_users)
-    list_users = list(users)
+    Returns:
+        HttpResponse: The rendered items, or a 304 response.
+    """
+    page_obj = flux_timeline(request.user).page(request.GET.get('cursor'),
+                                                PAGE_SIZE)
+    set_viewer_flags(page_obj.object_list, request.user)
 
-    # list of user tickets that have had a review
-    user_answered_tickets = Ticket.objects.filter(review__isnull=False,
-                                                  user=request.user).distinct()
+    as_json = request.GET.get('format') == 'json'
+    etag = page_etag(page_obj, request.user, as_json)
+    headers = {'ETag': etag,
+               'Cache-Control': 'private, no-cache',
+               'X-Next-Cursor': page_obj.next_cursor or ''}
 
-    # list of tickets that have a user review
-    user_review_tickets = Ticket.objects.filter(
-        review__user=request.user).distinct()
+    if etag in request.headers.get('If-None-Match', ''):
+        return HttpResponseNotModified(headers=headers)
 
-    # list of reviews of the user and those he follows
-    reviews = (Review.objects.select_related("user", "ticket").filter(
-        Q(user__in=list_users) |
-        Q(ticket__user__in=list_users))
-               .exclude(user__in=banned_users)
-               .exclude(ticket__user__in=banned_users)
-               .exclude(user__in=banning_users)
-               .exclude(ticket__user__in=banning_users)
-               )
+    html = render_to_string('reviews/partials/feed_items.html',
+                            {'page_obj': page_obj}, request)
+    if as_json:
+        return JsonResponse({'html': html,
+                             'next_cursor': page_obj.next_cursor},
+                            headers=headers)
+    return HttpResponse(html, headers=headers)
 
-    # list of tickets of the user and those he follows
-    tickets = Ticket.objects.filter(user__in=list_users)
 
-    reviews_and_tickets = sorted(
-        chain(reviews, tickets),
-        key=lambda instance: instance.time_created,
-        reverse=True
-    )
+@login_required
+async def new_posts(request):
+    """
+    Stream the number of feed items newer than the page read by the user,
+    as server-sent events.
 
-    paginator = Paginator(reviews_and_tickets, 6)
+    The feed page opens this stream with its `head_cursor` in `?cursor=`,
+    and offers to load the new items when they are announced, instead of
+    being reloaded to look for them. It is an async view holding no thread
+    while waiting, to be served by `LITRevu.asgi`; under WSGI, which would
+    hold a worker for the whole stream, it answers an empty 204 response.
 
-    page_number = request.GET.get('page')
+    Args:
+        request (HttpRequest): The HTTP request object.
 
-    page_obj = paginator.get_page(page_number)
+    Returns:
+        StreamingHttpResponse: The `text/event-stream` of "new-posts"
+                               events, or a 204 response.
+    """
+    if not streams_events(request):
+        # tells the browser not to reconnect
+        return HttpResponse(status=204)
 
-    context = {
-        'page_obj': page_obj,
-        'user_answered_tickets': user_answered_tickets,
-        'user_review_tickets': user_review_tickets,
-        'banning_users': banning_users
-    }
-    return render(request,
-                  'reviews/flux.html',
-                  context)
+    user = await request.auser()
+    response = StreamingHttpResponse(
+        new_posts_stream(user, request.GET.get('cursor')),
+        content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # tells the reverse proxies not to buffer the events
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @login_required
@@ -432,7 +472,8 @@ def user_posts(request):
       - All tickets created by the user.
 
     The reviews and tickets are combined, sorted in descending order by their
-    creation timestamp, and displayed in the 'user_posts.html' template.
+    creation timestamp, and displayed in the 'user_posts.html' template one
+    page at a time, following the `?cursor=` parameter.
 
     Args:
         request (HttpRequest): The HTTP request object containing user data.
@@ -441,16 +482,6 @@ def user_posts(request):
         HttpResponse: Renders the 'user_posts.html' template with the sorted
                       reviews and tickets.
     """
-    banning_users = get_banning_users(request.user)
-
-    # this two lists are used in context to display or not a button
-    # list of user tickets that have had a review
-    user_answered_tickets = Ticket.objects.filter(review__isnull=False,
-                                                  user=request.user).distinct()
-    # list of tickets that have a user review
-    user_review_tickets = Ticket.objects.filter(
-        review__user=request.user).distinct()
-
     reviews = Review.objects.filter(
         Q(user=request.user) |
         Q(ticket__user=request.user)
@@ -458,18 +489,15 @@ def user_posts(request):
 
     tickets = Ticket.objects.filter(user=request.user)
 
-    reviews_and_tickets = sorted(
-        chain(reviews, tickets),
-        key=lambda instance: instance.time_created,
-        reverse=True
-    )
+    page_obj = Timeline(reviews, tickets).page(request.GET.get('cursor'),
+                                               PAGE_SIZE)
+
+    # the buttons displayed on each item are decided here, in one pass
+    set_viewer_flags(page_obj.object_list, request.user)
 
     return render(request,
                   'reviews/user_posts.html',
-                  {'reviews_and_tickets': reviews_and_tickets,
-                   'user_answered_tickets': user_answered_tickets,
-                   'user_review_tickets': user_review_tickets,
-                   'banning_users': banning_users})
+                  {'page_obj': page_obj})
 
 
 @login_required
@@ -478,7 +506,9 @@ def follow(request):
     Allows the user to follow another user.
 
     - On POST: Adds a new follow relationship if the form is valid.
-    - On GET: Displays the follow form with a filtered user list.
+    - On GET: Displays the follow form, and a page of the followings and of
+      the followers of the user, read after the `?following_after=` and
+      `?followers_after=` ids, with their counters.
 
     The user can only follow people he doesn’t already follow and who
     haven’t blocked him.
@@ -489,17 +519,8 @@ def follow(request):
     Returns:
         HttpResponse: Redirects on success, otherwise renders 'follow.html'.
     """
-
-    banning_users = get_banning_users(request.user)
-
-    banned_users = get_banned_users(request.user)
-
-    followers_users = get_followers(request.user)
-
-    following_users = get_followings(request.user)
-
     if request.method == "POST":
-        form = FollowUserForm(request.POST, request.user)
+        form = FollowUserForm(request.POST, current_user=request.user)
         if form.is_valid():
             user_to_follow = form.cleaned_data['user']
 
@@ -512,17 +533,75 @@ def follow(request):
     else:
         form = FollowUserForm(current_user=request.user)
 
+    followers_page = users_page(followers_list(request.user),
+                                request.GET.get('followers_after'),
+                                FOLLOW_PAGE_SIZE)
+    following_page = users_page(followings_list(request.user),
+                                request.GET.get('following_after'),
+                                FOLLOW_PAGE_SIZE)
+
     return render(request,
                   'reviews/follow.html',
                   {
                       'form': form,
-                      'followers_users': followers_users,
-                      'following_users': following_users,
-                      'banned_users': banned_users,
-                      'banning_users': banning_users,
+                      'followers_page': followers_page,
+                      'following_page': following_page,
+                      'counts': get_follow_counts(request.user.id),
                   })
 
 
+@login_required
+def search_users(request):
+    """
+    Search the users that the user can follow by the beginning of their
+    username, for the follow form.
+
+    Args:
+        request (HttpRequest): The HTTP request object, the searched prefix
+                               being in `?q=`.
+
+    Returns:
+        JsonResponse: The id and the username of the first matching users.
+    """
+    users = find_users(request.user, request.GET.get('q', ''), SEARCH_LIMIT)
+    return JsonResponse({'results': [
+        {'id': user_id, 'username': username}
+        for user_id, username in users.values_list('id', 'username')
+    ]})
+
+
+@login_required
+@require_POST
+def bulk_follows(request):
+    """
+    Follow, unfollow, ban or unban many users at once, for the imports and
+    the moderation sweeps.
+
+    The relationships are written with a few bulk queries in one
+    transaction, and the caches depending on them are refreshed once for
+    the whole batch, see `follows.py`. With the materialized timeline, only
+    the user's own timeline is rebuilt during the request.
+
+    Args:
+        request (HttpRequest): The POST request, with the `action` and the
+                               `user_ids` of a `BulkFollowForm`.
+
+    Returns:
+        JsonResponse: The number of relationships changed, or the errors of
+                      the form with a 400 status.
+    """
+    form = BulkFollowForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+
+    action = form.cleaned_data['action']
+    # the timelines of the other users are rebuilt after the response
+    changed = follows.apply(action, request.user,
+                            form.cleaned_data['user_ids'],
+                            in_background=True)
+    return JsonResponse({'action': action, 'changed': changed})
+
+
 @login_required
 def unfollow(request, user_id):
     """
@@ -540,13 +619,13 @@ def unfollow(request, user_id):
     Returns:
         HttpResponseRedirect: Redirects to the 'follow' page after unfollowing.
     """
-    # list of members who have banned the user.
-    banning_users = get_banning_users(request.user)
+    # members who have banned the user.
+    banning_ids = get_relations(request.user.id).banning
 
     user_to_unfollow = get_object_or_404(User, id=user_id)
 
     # if the user to unsubscribe is not in the list
-    if not banning_users.filter(id=user_to_unfollow.id).exists():
+    if user_to_unfollow.id not in banning_ids:
         follow_relation = UserFollows.objects.filter(
             user=request.user,
             followed_user=user_to_unfollow
@@ -600,23 +679,13 @@ def ban_followers(request, user_id):
     """
     user_to_ban = get_object_or_404(User, id=user_id)
 
-    if UserFollows.objects.filter(
-            user=request.user,
-            followed_user=user_to_ban
-    ).exists():
-
-        user_relation = get_object_or_404(
-            UserFollows,
-            user=request.user,
-            followed_user=user_to_ban
-        )
-        user_relation.banned = True
-    else:
-        user_relation = UserFollows.objects.create(
-            user=request.user,
-            followed_user=user_to_ban,
-            banned=True)
-
+    # a follow of the user becomes a ban, or the ban is created
+    user_relation = (UserFollows.objects.filter(user=request.user,
+                                                followed_user=user_to_ban)
+                     .first()
+                     or UserFollows(user=request.user,
+                                    followed_user=user_to_ban))
+    user_relation.banned = True
     user_relation.save()
     return redirect('follow')
 